@@ -84,76 +84,84 @@ export const useSSEEvents = () => {
     const eventSource = new EventSource(url.toString());
     eventSourceRef.current = eventSource;
 
-    const onMessage = (event: MessageEvent) => {
-      try {
-        const payload: SSEEventPayload = JSON.parse(event.data);
-        const eventName = getEventName(payload);
-        const baseEventId = getEventId(payload);
-
-        if (payload.action === 'start') {
-          const eventId = baseEventId + Date.now().toString();
-          eventMap[baseEventId] = eventId;
-          const details = getEventDetails(payload);
-          // Normalize unknown types to memory_save
-          const eventType = ['crew', 'agent', 'task', 'tool', 'knowledge', 'llm', 'memory', 'memory_save', 'reasoning', 'sql_execution'].includes(payload.type as string)
-            ? payload.type as string
-            : 'memory_save';
-
-          setEvents(prev => {
-            // For memory_save, only add if it doesn't already exist
-            if (eventType === 'memory_save') {
-              const existingMemorySave = prev.find(e => e.type === 'memory_save' && e.name === 'Save Memory');
-              if (existingMemorySave) {
-                // Update eventMap to point to existing event
-                eventMap[baseEventId] = existingMemorySave.id;
-                return prev; // Don't add duplicate
-              }
+    const handlePayload = (payload: SSEEventPayload) => {
+      const eventName = getEventName(payload);
+      const baseEventId = getEventId(payload);
+
+      if (payload.action === 'start') {
+        const eventId = baseEventId + Date.now().toString();
+        eventMap[baseEventId] = eventId;
+        const details = getEventDetails(payload);
+        // Normalize unknown types to memory_save
+        const eventType = ['crew', 'agent', 'task', 'tool', 'knowledge', 'llm', 'memory', 'memory_save', 'reasoning', 'sql_execution'].includes(payload.type as string)
+          ? payload.type as string
+          : 'memory_save';
+
+        setEvents(prev => {
+          // For memory_save, only add if it doesn't already exist
+          if (eventType === 'memory_save') {
+            const existingMemorySave = prev.find(e => e.type === 'memory_save' && e.name === 'Save Memory');
+            if (existingMemorySave) {
+              // Update eventMap to point to existing event
+              eventMap[baseEventId] = existingMemorySave.id;
+              return prev; // Don't add duplicate
             }
-            
-            if (prev.some(e => e.id === eventId && !e.isComplete)) {
-              return prev;
+          }
+          
+          if (prev.some(e => e.id === eventId && !e.isComplete)) {
+            return prev;
+          }
+          return [
+            ...prev,
+            {
+              id: eventId,
+              type: eventType,
+              name: eventName,
+              startTime: Date.now(),
+              isComplete: false,
+              details
             }
-            return [
-              ...prev,
-              {
-                id: eventId,
-                type: eventType,
-                name: eventName,
-                startTime: Date.now(),
-                isComplete: false,
-                details
-              }
-            ];
-          });
-        }
+          ];
+        });
+      }
 
-        if (payload.action === 'complete') {
-          const eventId = eventMap[baseEventId];
-          const details = getEventDetails(payload);
-          if (eventId) {
-            // If crew is completing, mark all events as complete except sql_execution
-            if (payload.type === 'crew') {
-              setEvents(prev =>
-                prev.map(e =>
-                  !e.isComplete && e.type !== 'sql_execution'
-                    ? { ...e, isComplete: true, details: e.id === eventId ? (details || e.details) : e.details }
-                    : e
-                )
-              );
-            } else if (payload.type === 'memory_save') {
-              // Ignore memory_save complete events - only complete when crew completes
-              return;
-            } else {
-              setEvents(prev =>
-                prev.map(e =>
-                  e.id === eventId && !e.isComplete
-                    ? { ...e, isComplete: true, details: details || e.details }
-                    : e
-                )
-              );
-            }
+      if (payload.action === 'complete') {
+        const eventId = eventMap[baseEventId];
+        const details = getEventDetails(payload);
+        if (eventId) {
+          // If crew is completing, mark all events as complete except sql_execution
+          if (payload.type === 'crew') {
+            setEvents(prev =>
+              prev.map(e =>
+                !e.isComplete && e.type !== 'sql_execution'
+                  ? { ...e, isComplete: true, details: e.id === eventId ? (details || e.details) : e.details }
+                  : e
+              )
+            );
+          } else if (payload.type === 'memory_save') {
+            // Ignore memory_save complete events - only complete when crew completes
+            return;
+          } else {
+            setEvents(prev =>
+              prev.map(e =>
+                e.id === eventId && !e.isComplete
+                  ? { ...e, isComplete: true, details: details || e.details }
+                  : e
+              )
+            );
           }
         }
+      }
+    };
+
+    const onMessage = (event: MessageEvent) => {
+      try {
+        const payload: SSEEventPayload = JSON.parse(event.data);
+        if (payload.coalesced) {
+          // The backend merged a start/complete pair this client had not received yet
+          handlePayload({ ...payload, action: 'start' });
+        }
+        handlePayload(payload);
       } catch (err) {
         console.error('Invalid SSE payload:', event.data, err);
       }
@@ -25,6 +25,9 @@ export interface SSEEventPayload {
   model?: string;
   response?: string;
   query?: string;
+  coalesced?: boolean;
+  truncated?: string[];
+  body_url?: string;
 }
 
 export interface ActiveEvent {
@@ -1,5 +1,6 @@
 const crypto = require("crypto");
 const { supabase } = require("../config/SupabaseClient.js");
+const { refreshStandingPosting } = require("../utils/standingQueries.js");
 
 /* 1. CREATE JOB POSTING */
 exports.createJob = async (req, res) => {
@@ -82,6 +83,7 @@ exports.createJob = async (req, res) => {
     }
 
     console.log("Job created successfully:", id);
+    refreshStandingPosting(id);
     res.status(201).json({ ...jobData, skill_ids: skill_ids || [] });
   } catch (err) {
     console.error("Create job error:", err);
@@ -179,6 +181,7 @@ exports.updateJob = async (req, res) => {
       .single();
 
     if (error) return res.status(400).json({ error: error.message });
+    refreshStandingPosting(jobId);
     res.json(data);
   } catch (err) {
     res.status(500).json({ error: "Internal server error" });
@@ -196,6 +199,7 @@ exports.addSkillToJob = async (req, res) => {
       .insert({ job_posting_id, skill_id });
 
     if (error) return res.status(400).json({ error: error.message });
+    refreshStandingPosting(job_posting_id);
     res.json({ message: "Skill added to job" });
   } catch (err) {
     res.status(500).json({ error: "Server error" });
@@ -215,6 +219,7 @@ exports.removeSkillFromJob = async (req, res) => {
       .eq("skill_id", skill_id);
 
     if (error) return res.status(400).json({ error: error.message });
+    refreshStandingPosting(job_posting_id);
     res.json({ message: "Skill removed from job" });
   } catch (err) {
     res.status(500).json({ error: "Server error" });
@@ -231,6 +236,7 @@ exports.deleteJob = async (req, res) => {
       .eq("employer_id", req.user.id);
 
     if (error) return res.status(400).json({ error: error.message });
+    refreshStandingPosting(req.params.id);
     res.json({ message: "Job deleted successfully" });
   } catch (err) {
     res.status(500).json({ error: "Internal server error" });
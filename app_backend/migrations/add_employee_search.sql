@@ -0,0 +1,194 @@
+-- =============================================
+-- Denormalized employee search table
+-- Run this in your Supabase SQL Editor
+-- =============================================
+-- One row per employee with everything the SQL agent filters on:
+-- skill names as an array, the geography point, rating and experience.
+-- Search queries become single-table scans on a GiST (location) and a
+-- GIN (skills) index instead of joining employees / employee_skills / skills.
+--
+-- Writes to the source tables only mark the employee as dirty (cheap, in the
+-- writer's transaction). refresh_employee_search() rebuilds the dirty rows; the
+-- sql_agent_backend maintenance job calls it every few seconds and whenever
+-- a worker is saved (POST /employee_search/refresh).
+--
+-- Once this has run, set EMPLOYEE_SEARCH=1 for sql_agent_backend; it checks for
+-- these objects at startup and leaves the feature off without them.
+--
+-- refreshed_at and employee_search_removed form a change feed: the backend's
+-- in-memory search index reads only the rows refreshed (and the employees
+-- removed) since its last poll.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS employee_search (
+    id UUID PRIMARY KEY REFERENCES employees(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    phone VARCHAR(20),
+    years_of_experience INTEGER,
+    language VARCHAR(50),
+    rating NUMERIC(2, 1),
+    status VARCHAR(20),
+    location GEOGRAPHY,
+    skills TEXT[] NOT NULL DEFAULT '{}',
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_employee_search_location ON employee_search USING GIST (location);
+CREATE INDEX IF NOT EXISTS idx_employee_search_skills ON employee_search USING GIN (skills);
+CREATE INDEX IF NOT EXISTS idx_employee_search_rating ON employee_search(rating);
+CREATE INDEX IF NOT EXISTS idx_employee_search_experience ON employee_search(years_of_experience);
+CREATE INDEX IF NOT EXISTS idx_employee_search_refreshed ON employee_search(refreshed_at, id);
+
+-- Employees whose search row was deleted, kept for a day for the change feed
+CREATE TABLE IF NOT EXISTS employee_search_removed (
+    id UUID PRIMARY KEY,
+    removed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_employee_search_removed_at ON employee_search_removed(removed_at, id);
+
+-- Employees whose search row is out of date
+CREATE TABLE IF NOT EXISTS employee_search_dirty (
+    employee_id UUID PRIMARY KEY,
+    marked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Mark the employee touched by a write on employees / employee_skills
+CREATE OR REPLACE FUNCTION mark_employee_search_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'employees' THEN
+        INSERT INTO employee_search_dirty (employee_id)
+        VALUES (COALESCE(NEW.id, OLD.id))
+        ON CONFLICT (employee_id) DO NOTHING;
+    ELSE
+        INSERT INTO employee_search_dirty (employee_id)
+        SELECT employee_id FROM (VALUES (NEW.employee_id), (OLD.employee_id)) AS touched(employee_id)
+        WHERE employee_id IS NOT NULL
+        ON CONFLICT (employee_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A renamed skill changes the skills array of everyone who has it
+-- (deleted skills cascade to employee_skills, whose trigger covers them)
+CREATE OR REPLACE FUNCTION mark_skill_holders_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.skill_name IS DISTINCT FROM OLD.skill_name THEN
+        INSERT INTO employee_search_dirty (employee_id)
+        SELECT employee_id FROM employee_skills WHERE skill_id = NEW.id
+        ON CONFLICT (employee_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_employee_search_employees ON employees;
+CREATE TRIGGER trigger_employee_search_employees
+    AFTER INSERT OR DELETE OR UPDATE OF name, email, phone, years_of_experience, language, rating, status, location
+    ON employees
+    FOR EACH ROW
+    EXECUTE FUNCTION mark_employee_search_dirty();
+
+DROP TRIGGER IF EXISTS trigger_employee_search_employee_skills ON employee_skills;
+CREATE TRIGGER trigger_employee_search_employee_skills
+    AFTER INSERT OR UPDATE OR DELETE ON employee_skills
+    FOR EACH ROW
+    EXECUTE FUNCTION mark_employee_search_dirty();
+
+DROP TRIGGER IF EXISTS trigger_employee_search_skills ON skills;
+CREATE TRIGGER trigger_employee_search_skills
+    AFTER UPDATE OF skill_name ON skills
+    FOR EACH ROW
+    EXECUTE FUNCTION mark_skill_holders_dirty();
+
+-- Rebuild up to batch_size dirty rows; returns how many were processed.
+-- SKIP LOCKED lets concurrent callers (poller + save_db refresh) split the queue.
+CREATE OR REPLACE FUNCTION refresh_employee_search(batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS employee_search_batch (employee_id UUID PRIMARY KEY) ON COMMIT DROP;
+    TRUNCATE employee_search_batch;
+
+    WITH claimed AS (
+        DELETE FROM employee_search_dirty
+        WHERE employee_id IN (
+            SELECT employee_id FROM employee_search_dirty
+            ORDER BY marked_at
+            LIMIT batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING employee_id
+    )
+    INSERT INTO employee_search_batch SELECT employee_id FROM claimed;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+
+    IF refreshed = 0 THEN
+        RETURN 0;
+    END IF;
+
+    -- Deleted employees lose their row and are recorded for the change feed
+    WITH removed AS (
+        DELETE FROM employee_search es
+        USING employee_search_batch b
+        WHERE es.id = b.employee_id
+            AND NOT EXISTS (SELECT 1 FROM employees e WHERE e.id = b.employee_id)
+        RETURNING es.id
+    )
+    INSERT INTO employee_search_removed (id, removed_at)
+    SELECT id, NOW() FROM removed
+    ON CONFLICT (id) DO UPDATE SET removed_at = EXCLUDED.removed_at;
+
+    DELETE FROM employee_search_removed WHERE removed_at < NOW() - INTERVAL '1 day';
+
+    INSERT INTO employee_search (
+        id, name, email, phone, years_of_experience, language, rating, status, location, skills, refreshed_at
+    )
+    SELECT
+        e.id, e.name, e.email, e.phone, e.years_of_experience, e.language, e.rating, e.status, e.location,
+        COALESCE(array_agg(s.skill_name ORDER BY s.skill_name) FILTER (WHERE s.skill_name IS NOT NULL), '{}'),
+        NOW()
+    FROM employee_search_batch b
+    JOIN employees e ON e.id = b.employee_id
+    LEFT JOIN employee_skills es ON es.employee_id = e.id
+    LEFT JOIN skills s ON s.id = es.skill_id
+    GROUP BY e.id
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name,
+        email = EXCLUDED.email,
+        phone = EXCLUDED.phone,
+        years_of_experience = EXCLUDED.years_of_experience,
+        language = EXCLUDED.language,
+        rating = EXCLUDED.rating,
+        status = EXCLUDED.status,
+        location = EXCLUDED.location,
+        skills = EXCLUDED.skills,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- How far behind the search table is
+CREATE OR REPLACE FUNCTION employee_search_backlog()
+RETURNS TABLE (dirty_rows BIGINT, oldest_marked_at TIMESTAMP WITH TIME ZONE) AS $$
+BEGIN
+    RETURN QUERY SELECT COUNT(*), MIN(marked_at) FROM employee_search_dirty;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill: every existing employee starts dirty, the maintenance job drains them
+INSERT INTO employee_search_dirty (employee_id)
+SELECT id FROM employees
+ON CONFLICT (employee_id) DO NOTHING;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'employee_search created; % employees queued for the first refresh.',
+        (SELECT COUNT(*) FROM employee_search_dirty);
+END $$;
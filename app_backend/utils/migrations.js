@@ -14,6 +14,7 @@ const MIGRATIONS = [
   'fix_job_applications.sql',
   'fix_stack_depth.sql',
   'add_schedule_conflict_detection.sql',
+  'add_employee_search.sql',
 ];
 
 async function runMigrations() {
@@ -0,0 +1,22 @@
+// Tell sql_agent_backend that a job posting changed, so newly registered workers are
+// matched against its current location, radius and skills (see sql_agent_backend/standing_queries.py).
+// Best effort: if the backend is unreachable its periodic sync picks the change up instead.
+const STANDING_QUERIES_URL = process.env.STANDING_QUERIES_URL ?? 'http://localhost:8000';
+const STANDING_QUERIES_TIMEOUT_MS = 5000;
+
+async function refreshStandingPosting(postingId) {
+  // An empty STANDING_QUERIES_URL turns notifications off
+  if (!STANDING_QUERIES_URL) return;
+
+  try {
+    const response = await fetch(`${STANDING_QUERIES_URL}/standing/postings/${postingId}/refresh`, {
+      method: 'POST',
+      signal: AbortSignal.timeout(STANDING_QUERIES_TIMEOUT_MS),
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+  } catch (err) {
+    console.error(`Standing query refresh failed for posting ${postingId}:`, err.message);
+  }
+}
+
+module.exports = { refreshStandingPosting };
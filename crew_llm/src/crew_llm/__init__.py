@@ -0,0 +1 @@
+"""LLM plumbing shared by the crew projects: response cache and scheduler client."""
@@ -0,0 +1,285 @@
+"""
+Deterministic response cache for the LLM calls made by the crews.
+
+Responses are keyed by a hash of the model, its sampling parameters, the
+messages, the tools and the stop words, and persisted in a small SQLite file with TTL and size-bounded
+LRU eviction. Set LLM_CACHE_MODE to choose the behaviour:
+
+    on      read and write the cache (default)
+    off     bypass the cache entirely
+    record  always call the LLM and overwrite the cached response
+    replay  only serve cached responses; a miss raises LLMCacheMiss
+
+Misses are sent to the provider under a lease from the backend's global LLM
+scheduler (see scheduler_client).
+
+Each crew project wraps `cached_llm` with its own cache file, scheduler
+priority and, optionally, a `before_call` hook that runs ahead of every call
+(notify_agent checks its job's cancellation token there).
+"""
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from crewai.events import crewai_event_bus
+from crewai.events.base_events import BaseEvent
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+
+from crew_llm.scheduler_client import LLM_PRIORITY, estimate_tokens, scheduled
+
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # overrides the project's default location
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a call has no recorded response"""
+
+
+class LLMCacheEvent(BaseEvent):
+    """Emitted on the crewai event bus after every cache lookup"""
+
+    type: str = "llm_cache"
+    hit: bool
+    model: str
+    hits: int
+    misses: int
+
+
+class ResponseCache:
+    """SQLite-backed key -> response store with TTL and LRU eviction by total size"""
+
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                task_name TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+
+    def __deepcopy__(self, memo):
+        return self  # one store per process, shared by copied agents
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, response: str, model: str, task_name: Optional[str]):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, task_name, response, size, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        if self.ttl:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                return
+
+
+# LLM settings that change what the model returns; LLMs that differ in any of them never share entries
+SAMPLING_PARAMS = (
+    "temperature", "top_p", "n", "max_tokens", "max_completion_tokens", "presence_penalty",
+    "frequency_penalty", "logit_bias", "seed", "logprobs", "top_logprobs", "response_format",
+    "reasoning_effort", "base_url", "api_base", "api_version",
+)
+
+
+def sampling_params(llm: Any) -> Dict[str, Any]:
+    """The SAMPLING_PARAMS the LLM sets (None ones left out, so unset and absent hash alike)"""
+    params = {name: getattr(llm, name, None) for name in SAMPLING_PARAMS}
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def cache_key(
+    model: str, messages: Any, tools: Any, stop: List[str], response_model: Any, params: Optional[Dict[str, Any]] = None
+) -> str:
+    schema = response_model.model_json_schema() if response_model is not None else None
+    material = json.dumps(
+        {
+            "model": model,
+            "params": params or {},
+            "messages": messages,
+            "tools": tools,
+            # The executor builds the stop list from a set, so its order is not stable
+            "stop": sorted(stop or []),
+            "response_model": schema,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CachedLLM(BaseLLM):
+    """Wraps another crewai LLM and serves repeated calls from the ResponseCache"""
+
+    # task name -> [hits, misses], shared by every wrapped LLM in the process
+    stats: Dict[str, List[int]] = {}
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        cache: Optional[ResponseCache] = None,
+        mode: str = CACHE_MODE,
+        priority: str = LLM_PRIORITY,
+        before_call: Optional[Callable[[], None]] = None,
+    ):
+        self.llm = llm
+        super().__init__(model=llm.model, temperature=llm.temperature, stop=llm.stop)
+        self.cache = cache
+        self.mode = mode
+        self.priority = priority
+        self.before_call = before_call
+
+    # The agent executor appends its own stop words; they must reach the wrapped LLM
+    @property
+    def stop(self) -> List[str]:  # type: ignore[override]
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value: List[str]):
+        self.llm.stop = value
+
+    def __getattr__(self, name: str):
+        llm = self.__dict__.get("llm")
+        if llm is None:
+            raise AttributeError(name)
+        return getattr(llm, name)
+
+    def __deepcopy__(self, memo):
+        return CachedLLM(copy.deepcopy(self.llm, memo), self.cache, self.mode, self.priority, self.before_call)
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()  # type: ignore[attr-defined]
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ):
+        if self.before_call is not None:
+            self.before_call()
+
+        # Calls that execute functions inside the LLM have side effects; never cache them
+        if self.mode == "off" or self.cache is None or available_functions:
+            return self._call_upstream(messages, tools, callbacks, available_functions, from_task, from_agent, response_model)
+
+        task_name = getattr(from_task, "name", None) or "unknown"
+        key = cache_key(self.model, messages, tools, self.stop, response_model, sampling_params(self.llm))
+
+        cached = self.cache.get(key) if self.mode in ("on", "replay") else None
+        self._record(task_name, cached is not None, from_agent)
+        if cached is not None:
+            return cached
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded LLM response for task '{task_name}' (key {key[:12]})")
+
+        response = self._call_upstream(messages, tools, callbacks, available_functions, from_task, from_agent, response_model)
+        # Structured (non-string) responses are passed through uncached
+        if isinstance(response, str):
+            self.cache.put(key, response, self.model, task_name)
+        return response
+
+    def _call_upstream(self, messages, *args):
+        """Call the wrapped LLM under a lease from the global LLM scheduler"""
+        with scheduled(self.model, messages, self.priority) as usage:
+            response = self.llm.call(messages, *args)
+            usage["tokens"] = estimate_tokens(messages, 0) + estimate_tokens(str(response), 0)
+        return response
+
+    def _record(self, task_name: str, hit: bool, from_agent):
+        counts = CachedLLM.stats.setdefault(task_name, [0, 0])
+        counts[0 if hit else 1] += 1
+        crewai_event_bus.emit(
+            self,
+            LLMCacheEvent(
+                hit=hit,
+                model=self.model,
+                hits=counts[0],
+                misses=counts[1],
+                task_name=task_name,
+                agent_role=getattr(from_agent, "role", None),
+            ),
+        )
+
+
+# path -> store, so every LLM of a process that uses the same file shares one connection
+_caches: Dict[str, ResponseCache] = {}
+
+
+def cached_llm(
+    llm: Any = None,
+    cache_path: str = ".llm_cache.sqlite3",
+    priority: str = LLM_PRIORITY,
+    before_call: Optional[Callable[[], None]] = None,
+) -> BaseLLM:
+    """The crew's LLM (from MODEL when not given) behind the response cache at `cache_path`"""
+    base = create_llm(llm)
+    # Still wrapped with the cache off, so calls keep going through before_call and the scheduler
+    if CACHE_MODE == "off":
+        return CachedLLM(base, None, priority=priority, before_call=before_call)  # type: ignore[arg-type]
+    path = CACHE_PATH or cache_path
+    if path not in _caches:
+        _caches[path] = ResponseCache(path)
+    return CachedLLM(base, _caches[path], priority=priority, before_call=before_call)  # type: ignore[arg-type]
+
+
+def cache_report() -> Dict[str, dict]:
+    """Per-task hit counts and hit rate for this process"""
+    return {
+        task: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+        for task, (hits, misses) in CachedLLM.stats.items()
+    }
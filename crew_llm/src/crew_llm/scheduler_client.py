@@ -0,0 +1,97 @@
+"""
+Client for the backend's global LLM scheduler (/llm/acquire, /llm/release).
+
+Every uncached LLM call holds a lease for its model while it runs, so all
+crews share the provider's rate limits and a live voice call is served before
+an interactive search, which is served before a batch job. LLM_PRIORITY sets
+this process's class; each crew project passes its own default. When the backend cannot be reached the call goes ahead
+unscheduled, and the backend is not tried again for RETRY_AFTER_SECONDS.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import requests
+
+LLM_SCHEDULER_URL = os.getenv("LLM_SCHEDULER_URL", "http://localhost:8000")
+LLM_PRIORITY = os.getenv("LLM_PRIORITY", "interactive")
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "60"))
+
+# Completion tokens assumed for a call before its real size is known
+EXPECTED_OUTPUT_TOKENS = 500
+RETRY_AFTER_SECONDS = 30
+
+_unavailable_until = 0.0
+
+
+def estimate_tokens(messages, output_tokens: int = EXPECTED_OUTPUT_TOKENS) -> int:
+    """Rough token count (4 characters per token) of the prompt plus the expected completion"""
+    text = messages if isinstance(messages, str) else json.dumps(messages, default=str)
+    return len(text) // 4 + output_tokens
+
+
+def is_rate_limit(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text
+
+
+def _backend_down(error: Exception):
+    global _unavailable_until
+    _unavailable_until = time.time() + RETRY_AFTER_SECONDS
+    print(f"LLM scheduler unavailable, calling the model unscheduled: {error}")
+
+
+def acquire(model: str, tokens: int, priority: str = LLM_PRIORITY) -> Optional[str]:
+    """Block until the scheduler grants a lease; None means go ahead without one"""
+    if not LLM_SCHEDULER_URL or time.time() < _unavailable_until:
+        return None
+    try:
+        response = requests.post(
+            f"{LLM_SCHEDULER_URL}/llm/acquire",
+            json={"model": model, "priority": priority, "tokens": tokens, "timeout": LLM_ACQUIRE_TIMEOUT},
+            timeout=LLM_ACQUIRE_TIMEOUT + 5
+        )
+    except requests.RequestException as e:
+        _backend_down(e)
+        return None
+
+    if response.status_code == 503:
+        print(f"No LLM slot for {model} after {LLM_ACQUIRE_TIMEOUT:.0f}s, calling anyway")
+        return None
+    if not response.ok:
+        _backend_down(Exception(f"{response.status_code} {response.text}"))
+        return None
+    return response.json()["lease"]
+
+
+def release(lease: str, tokens: Optional[int] = None, throttled: bool = False):
+    try:
+        requests.post(
+            f"{LLM_SCHEDULER_URL}/llm/release",
+            json={"lease": lease, "tokens": tokens, "throttled": throttled},
+            timeout=5
+        )
+    except requests.RequestException as e:
+        _backend_down(e)
+
+
+@contextmanager
+def scheduled(model: str, messages, priority: str = LLM_PRIORITY):
+    """
+    Hold a lease for the duration of one LLM call. The body may set
+    usage["tokens"] to what the call really used; a rate-limit error is
+    reported so the scheduler backs the model off.
+    """
+    usage = {"tokens": estimate_tokens(messages)}
+    lease = acquire(model, usage["tokens"], priority)
+    throttled = False
+    try:
+        yield usage
+    except Exception as e:
+        throttled = is_rate_limit(e)
+        raise
+    finally:
+        if lease is not None:
+            release(lease, usage["tokens"], throttled)
@@ -0,0 +1,117 @@
+"""
+Cancellation token and per-stage deadlines for one crew run.
+
+The backend starts `crewai run` with JOB_ID and JOB_DEADLINE (epoch seconds)
+in the environment and sends SIGTERM when the employer goes away. Both end up
+on the process-wide `token`:
+
+- SIGTERM cancels the token and raises JobCancelled in the main thread, which
+  interrupts whatever the crew is blocked on (LLM call, tool, RPC).
+- LLM calls and tools call `token.check(...)` before doing any work.
+- `stage(name, seconds)` opens a budget for one part of the run:
+  "generation" (the whole kickoff), "exploration" (tool calls, nested inside
+  generation: it closes first so the agent still has time to write its SQL)
+  and "final_query" (the result RPC). None of them can outlive JOB_DEADLINE,
+  and a stage opened inside another cannot outlive the enclosing one.
+"""
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+STAGE_BUDGETS = {
+    "exploration": float(os.getenv("STAGE_EXPLORATION_SECONDS", "120")),
+    "generation": float(os.getenv("STAGE_GENERATION_SECONDS", "240")),
+    "final_query": float(os.getenv("STAGE_FINAL_QUERY_SECONDS", "30")),
+}
+
+
+class JobCancelled(BaseException):
+    """The job was cancelled or ran out of time (BaseException so tool and crew error handling cannot swallow it)"""
+
+
+class CancellationToken:
+    def __init__(self, job_id: Optional[str] = None, deadline: Optional[float] = None):
+        self.job_id = job_id
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._stages: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls) -> "CancellationToken":
+        deadline = os.getenv("JOB_DEADLINE")
+        return cls(os.getenv("JOB_ID"), float(deadline) if deadline else None)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str):
+        if not self.cancelled:
+            self.reason = reason
+            self._cancelled.set()
+
+    def remaining(self, stage: Optional[str] = None) -> Optional[float]:
+        """Seconds left before the job deadline (or the stage's, whichever is sooner)"""
+        deadlines = [self.deadline] if self.deadline else []
+        if stage in self._stages:
+            deadlines.append(self._stages[stage])
+        if not deadlines:
+            return None
+        return min(deadlines) - time.time()
+
+    def expired(self, stage: Optional[str] = None) -> bool:
+        remaining = self.remaining(stage)
+        return remaining is not None and remaining <= 0
+
+    def check(self, stage: Optional[str] = None):
+        """Raise JobCancelled when the job is cancelled or `stage` has no time left"""
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_id} cancelled: {self.reason}")
+        if self.expired(stage):
+            self.cancel(f"{stage or 'job'} deadline exceeded")
+            raise JobCancelled(f"Job {self.job_id} cancelled: {self.reason}")
+
+    @contextmanager
+    def stage(self, name: str, seconds: Optional[float] = None):
+        deadline = time.time() + (STAGE_BUDGETS[name] if seconds is None else seconds)
+        self._stages[name] = min([deadline, *self._stages.values()])
+        try:
+            yield self
+        finally:
+            self._stages.pop(name, None)
+
+
+token = CancellationToken.from_env()
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deadline")
+
+
+def run_with_deadline(fn: Callable[[], T], stage: Optional[str] = None) -> T:
+    """Run a blocking call, giving up with JobCancelled once the stage's time is up"""
+    token.check(stage)
+    remaining = token.remaining(stage)
+    if remaining is None:
+        return fn()
+    future = _executor.submit(fn)
+    try:
+        return future.result(timeout=max(remaining, 0))
+    except FutureTimeout:
+        token.cancel(f"{stage or 'job'} deadline exceeded")
+        raise JobCancelled(f"Job {token.job_id} cancelled: {token.reason}")
+
+
+def install_signal_handlers():
+    """Turn SIGTERM from the backend into JobCancelled in the main thread"""
+    def on_sigterm(signum, frame):
+        token.cancel("terminated by backend")
+        raise JobCancelled(f"Job {token.job_id} cancelled: {token.reason}")
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, on_sigterm)
@@ -2,7 +2,32 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
+import os
 from notify_agent.tools.supabase_tools import ExecuteSQLTool, GetTableSchemaTool, ListTablesTool
+from notify_agent.llm_cache import cached_llm
+from notify_agent.memory_store import scoped_memories
+
+HOSTED_TRACING = os.getenv("HOSTED_TRACING", "1") == "1"
+
+# This run's input.json/output.txt, relative to the project root (the backend gives every search its own);
+# relative because crewai resolves a task's output_file against the working directory
+JOB_DIR = os.getenv("JOB_DIR", ".")
+
+# Execution profiles, tried in notify_agent.policy.PROFILE_ORDER
+PROFILES = {
+    "fast": {
+        "model": os.getenv("FAST_MODEL", "gpt-4.1-mini"),
+        "reasoning": False,
+        "memory": False,
+        "planning": False,
+    },
+    "full": {
+        "model": None,  # MODEL from the environment
+        "reasoning": True,
+        "memory": True,
+        "planning": True,
+    },
+}
 
 @CrewBase
 class NotifyAgent():
@@ -11,13 +36,26 @@ class NotifyAgent():
     agents: List[BaseAgent]
     tasks: List[Task]
 
+    profile: str = "full"
+    memory_scope: str | None = None
+
+    def with_profile(self, profile: str) -> "NotifyAgent":
+        self.profile = profile
+        return self
+
+    def with_memory_scope(self, scope: str | None) -> "NotifyAgent":
+        """Keep this crew's memories separate from other employers' searches"""
+        self.memory_scope = scope
+        return self
+
     @agent
     def query_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['query_agent'], # type: ignore[index]
             tools = [ExecuteSQLTool(),GetTableSchemaTool(),ListTablesTool()],
+            llm=cached_llm(PROFILES[self.profile]["model"]),
             verbose=True,
-            reasoning=True,  
+            reasoning=PROFILES[self.profile]["reasoning"],
             max_reasoning_attempts=3
         )
 
@@ -25,18 +63,23 @@ class NotifyAgent():
     def query_task(self) -> Task:
         return Task(
             config=self.tasks_config['query_task'], # type: ignore[index]
+            output_file=os.path.join(JOB_DIR, "output.txt"),
         )
 
     @crew
     def crew(self) -> Crew:
         """Creates the NotifyAgent crew"""
 
+        memory = PROFILES[self.profile]["memory"]
+
         return Crew(
             agents=self.agents, # Automatically created by the @agent decorator
             tasks=self.tasks, # Automatically created by the @task decorator
             process=Process.sequential,
             verbose=True,
-            tracing=True,
-            memory=True,
-            planning=True
+            # Hosted crewai tracing; local spans are recorded by notify_agent.tracing either way
+            tracing=HOSTED_TRACING,
+            memory=memory,
+            planning=PROFILES[self.profile]["planning"],
+            **(scoped_memories(self.memory_scope) if memory else {})
         )
@@ -19,10 +19,23 @@ from crewai.events import (
     AgentReasoningCompletedEvent,
 )
 from crewai.events import BaseEventListener
+from notify_agent.llm_cache import LLMCacheEvent
+from notify_agent.tracing import tracer
+import os
 import requests
 
 SSE_BACKEND = "http://localhost:8000/emit"
 
+# Set by the backend for each search; lets it attach exploratory results to the right job
+JOB_ID = os.getenv("JOB_ID")
+
+def emit(payload, timestamp=None):
+    """Record the event in the local trace and forward it to the SSE hub"""
+    tracer.record(payload, timestamp)
+    if JOB_ID:
+        payload = {**payload, "job_id": JOB_ID}
+    requests.post(SSE_BACKEND, json=payload, timeout=2)
+
 class MyCustomListener(BaseEventListener):
     def __init__(self):
         super().__init__()
@@ -35,7 +48,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "start",
                 "crew_name": event.crew_name
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(CrewKickoffCompletedEvent)
@@ -45,7 +58,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "complete",
                 "crew_name": event.crew_name
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(AgentExecutionStartedEvent)
@@ -56,7 +69,7 @@ class MyCustomListener(BaseEventListener):
                 "agent_role": event.agent.role,
                 "agent_goal": event.agent.goal
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(AgentExecutionCompletedEvent)
@@ -66,7 +79,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "complete",
                 "agent_role": event.agent.role
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(TaskStartedEvent)
@@ -77,7 +90,7 @@ class MyCustomListener(BaseEventListener):
                 "task_name": event.task.name,
                 "task_desc": event.task.description
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(TaskCompletedEvent)
@@ -87,7 +100,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "complete",
                 "task_name": event.task.name
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(ToolUsageStartedEvent)
@@ -97,7 +110,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "start",
                 "tool_name": event.tool_name
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(ToolUsageFinishedEvent)
@@ -106,9 +119,10 @@ class MyCustomListener(BaseEventListener):
                 "type": "tool",
                 "action": "complete",
                 "tool_name": event.tool_name,
+                "tool_args": event.tool_args,
                 "tool_output": event.output
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(KnowledgeRetrievalStartedEvent)
@@ -117,7 +131,7 @@ class MyCustomListener(BaseEventListener):
                 "type": "knowledge",
                 "action": "start"
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(KnowledgeRetrievalCompletedEvent)
@@ -126,7 +140,7 @@ class MyCustomListener(BaseEventListener):
                 "type": "knowledge",
                 "action": "complete"
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(LLMCallStartedEvent)
@@ -136,7 +150,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "start",
                 "model": event.model
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(LLMCallCompletedEvent)
@@ -147,7 +161,7 @@ class MyCustomListener(BaseEventListener):
                 "model": event.model,
                 "response": event.response
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(MemoryRetrievalStartedEvent)
@@ -156,16 +170,17 @@ class MyCustomListener(BaseEventListener):
                 "type": "memory",
                 "action": "start"
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(MemoryRetrievalCompletedEvent)
         def on_memory_retrieval_completed(source, event):
             payload = {
                 "type": "memory",
-                "action": "complete"
+                "action": "complete",
+                "retrieval_time_ms": event.retrieval_time_ms
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(MemorySaveStartedEvent)
@@ -174,16 +189,17 @@ class MyCustomListener(BaseEventListener):
                 "type": "memory_save",
                 "action": "start"
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(MemorySaveCompletedEvent)
         def on_memory_save_completed(source, event):
             payload = {
                 "type": "memory_save",
-                "action": "complete"
+                "action": "complete",
+                "save_time_ms": event.save_time_ms
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(AgentReasoningStartedEvent)
@@ -193,7 +209,7 @@ class MyCustomListener(BaseEventListener):
                 "action": "start",
                 "agent_role": event.agent.role if hasattr(event, 'agent') else None
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
 
 
         @crewai_event_bus.on(AgentReasoningCompletedEvent)
@@ -204,5 +220,18 @@ class MyCustomListener(BaseEventListener):
                 "agent_role": event.agent.role if hasattr(event, 'agent') else None,
                 "reasoning": event.reasoning if hasattr(event, 'reasoning') else None
             }
-            requests.post(SSE_BACKEND, json=payload, timeout=2)
+            emit(payload, event.timestamp)
+
 
+        @crewai_event_bus.on(LLMCacheEvent)
+        def on_llm_cache_lookup(source, event):
+            payload = {
+                "type": "llm_cache",
+                "action": "hit" if event.hit else "miss",
+                "task_name": event.task_name,
+                "model": event.model,
+                "hits": event.hits,
+                "misses": event.misses,
+                "hit_rate": event.hits / (event.hits + event.misses)
+            }
+            emit(payload, event.timestamp)
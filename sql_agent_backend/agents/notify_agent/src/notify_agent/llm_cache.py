@@ -0,0 +1,29 @@
+"""
+The crew's LLM behind the shared response cache and LLM scheduler (crew_llm).
+
+Every call also checks the job's cancellation token first, so a cancelled or
+out-of-time search never starts another LLM request.
+"""
+import os
+from pathlib import Path
+
+from crewai.llms.base_llm import BaseLLM
+
+from crew_llm.cache import LLMCacheEvent, LLMCacheMiss, cache_report
+from crew_llm.cache import cached_llm as shared_cached_llm
+from notify_agent.cancellation import token
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
+
+LLM_PRIORITY = os.getenv("LLM_PRIORITY", "interactive")
+
+__all__ = ["LLMCacheEvent", "LLMCacheMiss", "cache_report", "cached_llm"]
+
+
+def cached_llm(llm=None) -> BaseLLM:
+    return shared_cached_llm(
+        llm,
+        cache_path=str(ROOT_DIR / ".llm_cache.sqlite3"),
+        priority=LLM_PRIORITY,
+        before_call=lambda: token.check("generation"),
+    )
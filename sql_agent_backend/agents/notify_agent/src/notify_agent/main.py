@@ -2,27 +2,61 @@
 import sys
 import warnings
 from datetime import datetime
-from notify_agent.crew import NotifyAgent
+from notify_agent.crew import JOB_DIR, NotifyAgent
 import json
 from pathlib import Path
 import re
 from notify_agent.tools.supabase_tools import supabase
-from notify_agent.listeners.custom import MyCustomListener
+from notify_agent.listeners.custom import MyCustomListener, emit
+from notify_agent.cancellation import JobCancelled, install_signal_handlers, run_with_deadline, token
+from notify_agent.llm_cache import cache_report
+from notify_agent.memory_store import memory_report
+from notify_agent.policy import PROFILE_ORDER, validate_sql, validate_rows, record_attempt
+from notify_agent.tracing import tracer
 import requests
+import os
+import time
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
-SSE_BACKEND = "http://localhost:8000/emit"
+# Exit status the backend maps to a timed-out search
+EXIT_CANCELLED = 124
+
+# Backend serving the in-memory search index (unset -> always use the execute_sql RPC)
+SEARCH_INDEX_URL = os.getenv("SEARCH_INDEX_URL")
 
 listener = MyCustomListener()
 
 ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
-INPUT_FILE = ROOT_DIR / "input.json"
-QUERY_FILE = ROOT_DIR / "query.txt"
-OUTPUT_FILE = ROOT_DIR / "output.txt"
+INPUT_FILE = ROOT_DIR / JOB_DIR / "input.json"
+QUERY_FILE = ROOT_DIR / JOB_DIR / "query.txt"
+OUTPUT_FILE = ROOT_DIR / JOB_DIR / "output.txt"
 
-def execute_sql_without_limit(input_path: str, output_path: str, supabase):
+def query_search_index(query: str):
+    """Answer the final query from the backend's search index, or None to fall back to the RPC"""
+    if not SEARCH_INDEX_URL:
+        return None
+
+    try:
+        response = requests.post(
+            f"{SEARCH_INDEX_URL}/index/sql",
+            json={"query": query},
+            timeout=5
+        )
+        response.raise_for_status()
+        body = response.json()
+    except Exception as e:
+        print(f"Search index unavailable, using execute_sql: {e}")
+        return None
+
+    if not body.get("matched"):
+        return None
 
+    print(f"Answered from search index in {body['took_ms']:.2f} ms")
+    return body["rows"]
+
+def read_final_query(input_path: str) -> str:
+    """The crew's SQL with exploration LIMITs removed"""
     with open(input_path, "r") as f:
         query = f.read().strip()
 
@@ -34,8 +68,9 @@ def execute_sql_without_limit(input_path: str, output_path: str, supabase):
     )
 
     cleaned_query = cleaned_query.strip()
-    cleaned_query = cleaned_query.rstrip(";") + ";"
+    return cleaned_query.rstrip(";") + ";"
 
+def execute_final_query(cleaned_query: str, supabase):
     print(f"Query: {cleaned_query}")
 
     # Send SQL execution start event
@@ -45,15 +80,19 @@ def execute_sql_without_limit(input_path: str, output_path: str, supabase):
         "query": cleaned_query
     }
     try:
-        requests.post(SSE_BACKEND, json=payload, timeout=2)
+        emit(payload)
     except:
         pass
 
-    response = (
-        supabase
-        .rpc("execute_sql", {"query": cleaned_query})
-        .execute()
-    )
+    with token.stage("final_query"):
+        data = query_search_index(cleaned_query)
+        if data is None:
+            data = run_with_deadline(
+                lambda: supabase
+                .rpc("execute_sql", {"query": cleaned_query})
+                .execute(),
+                "final_query"
+            ).data
 
     # Send SQL execution complete event
     payload = {
@@ -62,32 +101,111 @@ def execute_sql_without_limit(input_path: str, output_path: str, supabase):
         "query": cleaned_query,
     }
     try:
-        requests.post(SSE_BACKEND, json=payload, timeout=2)
+        emit(payload)
     except:
         pass
 
+    return data
+
+def write_result(output_path: str, cleaned_query: str, data):
     with open(output_path, "w") as f:
-        f.write(json.dumps(response.data, indent=2))
+        f.write(json.dumps(data, indent=2))
 
     with open(QUERY_FILE, "w") as f:
         f.write(cleaned_query)
     
     print("Executed the sql query successfully !!")
 
+def execute_sql_without_limit(input_path: str, output_path: str, supabase):
+    cleaned_query = read_final_query(input_path)
+    data = execute_final_query(cleaned_query, supabase)
+    write_result(output_path, cleaned_query, data)
+
+def run_profile(notify_agent: NotifyAgent, inputs: dict, last: bool):
+    """
+    Run the crew with one execution profile and validate what it produced.
+    Returns (problems, cleaned_query, data); problems is empty when the result is accepted.
+    """
+    # One kickoff runs both stages, so exploration is a window nested inside
+    # generation rather than a separate phase: once it closes, tools answer
+    # EXPLORATION_EXHAUSTED and the agent writes its SQL in the time that is left
+    # of the generation budget, which is the hard stop for the whole kickoff.
+    with token.stage("generation"):
+        with token.stage("exploration"):
+            notify_agent.crew().kickoff(inputs=inputs)
+
+    cleaned_query = read_final_query(str(OUTPUT_FILE))
+    problems = validate_sql(cleaned_query)
+    if any(problem.startswith(("not read-only", "more than one statement")) for problem in problems):
+        if last:
+            raise Exception(f"Refusing to execute generated SQL: {'; '.join(problems)}")
+        return problems, cleaned_query, None
+
+    # The full profile's answer is final, so it runs even if the static checks complain
+    if problems and not last:
+        return problems, cleaned_query, None
+
+    try:
+        data = execute_final_query(cleaned_query, supabase)
+    except Exception as e:
+        if last:
+            raise
+        return [f"execution failed: {e}"], cleaned_query, None
+
+    return problems + validate_rows(data, problems), cleaned_query, data
+
 def run():
     """
     Run the crew.
     """
+    install_signal_handlers()
     
     with open(INPUT_FILE, "r") as f:
         inputs = f.read() 
 
     inputs = json.loads(inputs)
 
-    try:
-        crew = NotifyAgent().crew()
-        crew.kickoff(inputs=inputs)
+    # crewai memoizes @agent methods per instance id, so every profile's instance
+    # is kept alive for the whole run to stop a later one reusing a freed id
+    notify_agents = {
+        profile: NotifyAgent().with_profile(profile).with_memory_scope(inputs.get("user_id"))
+        for profile in PROFILE_ORDER
+    }
 
-        execute_sql_without_limit(str(OUTPUT_FILE),str(OUTPUT_FILE),supabase)
+    try:
+        for profile in PROFILE_ORDER:
+            last = profile == PROFILE_ORDER[-1]
+
+            started = time.perf_counter()
+            problems, cleaned_query, data = run_profile(notify_agents[profile], inputs, last)
+            attempt = record_attempt(profile, time.perf_counter() - started, problems, escalated=bool(problems) and not last)
+
+            payload = {
+                "type": "policy",
+                "action": "escalate" if attempt["escalated"] else "accept",
+                **attempt
+            }
+            try:
+                emit(payload)
+            except:
+                pass
+
+            if not attempt["escalated"]:
+                break
+            token.check()
+            print(f"Profile '{profile}' rejected ({'; '.join(problems)}), escalating")
+
+        print(f"LLM cache: {cache_report()}")
+        print(f"Memory: {memory_report()}")
+        write_result(str(OUTPUT_FILE), cleaned_query, data)
+    except JobCancelled as e:
+        print(e)
+        # output.txt may hold the task's raw SQL; leave no partial result behind
+        OUTPUT_FILE.unlink(missing_ok=True)
+        sys.exit(EXIT_CANCELLED)
     except Exception as e:
-        raise Exception(f"An error occurred while running the crew: {e}")
\ No newline at end of file
+        raise Exception(f"An error occurred while running the crew: {e}")
+    finally:
+        trace_path = tracer.save()
+        if trace_path:
+            print(f"Trace written to {trace_path}")
\ No newline at end of file
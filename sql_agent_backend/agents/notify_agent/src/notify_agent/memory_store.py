@@ -0,0 +1,247 @@
+"""
+Bounded, per-employer memory backend for the NotifyAgent crew.
+
+crewai's default memory writes every search into one shared store under the
+agent directory, which grows forever and mixes context between employers.
+ScopedMemoryStorage keeps short-term, entity and long-term memories in one
+SQLite file, partitioned by scope (the employer id). Each (scope, kind)
+partition is capped with LRU eviction and a TTL, and the whole file is
+compacted every MEMORY_COMPACT_EVERY saves. Search is lexical over at most
+MEMORY_MAX_ENTRIES rows, so retrieval latency stays flat as usage grows.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from crewai.memory.entity.entity_memory import EntityMemory
+from crewai.memory.long_term.long_term_memory import LongTermMemory
+from crewai.memory.short_term.short_term_memory import ShortTermMemory
+from crewai.memory.storage.interface import Storage
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
+
+MEMORY_DB = os.getenv("MEMORY_DB", str(ROOT_DIR / "memory.sqlite3"))
+MEMORY_MAX_ENTRIES = int(os.getenv("MEMORY_MAX_ENTRIES", "200"))
+MEMORY_TTL_SECONDS = float(os.getenv("MEMORY_TTL_SECONDS", str(30 * 24 * 3600)))
+MEMORY_COMPACT_EVERY = int(os.getenv("MEMORY_COMPACT_EVERY", "50"))
+
+# Lexical scores are not on the embedding similarity scale crewai passes in as
+# score_threshold, so results are filtered with this floor instead
+MIN_SCORE = 0.15
+
+TERM_RE = re.compile(r"[a-z0-9_]+")
+
+_lock = threading.Lock()
+_saves = 0
+retrieval_latencies_ms: deque = deque(maxlen=1000)
+
+
+@contextmanager
+def _connect(path: str = MEMORY_DB) -> Iterator[sqlite3.Connection]:
+    """One connection for a `with` block: committed on success, rolled back on error, always closed"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            _ensure_schema(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _ensure_schema(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS memories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scope TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            content TEXT NOT NULL,
+            metadata TEXT,
+            terms TEXT NOT NULL,
+            datetime TEXT,
+            score REAL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS memories_scope ON memories (scope, kind, accessed_at)")
+
+
+def _terms(text: str) -> List[str]:
+    return sorted(set(TERM_RE.findall(text.lower())))
+
+
+def _similarity(query_terms: set, terms: List[str]) -> float:
+    if not query_terms or not terms:
+        return 0.0
+    return len(query_terms.intersection(terms)) / (len(query_terms) * len(terms)) ** 0.5
+
+
+def compact(path: str = MEMORY_DB, max_entries: int = MEMORY_MAX_ENTRIES, ttl: float = MEMORY_TTL_SECONDS) -> dict:
+    """Drop expired rows, collapse duplicate short-term/entity rows, enforce every partition's cap and reclaim space"""
+    with _lock, _connect(path) as conn:
+        before = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+        conn.execute("DELETE FROM memories WHERE created_at < ?", (time.time() - ttl,))
+        conn.execute(
+            """
+            DELETE FROM memories WHERE kind != 'long_term' AND id NOT IN (
+                SELECT MAX(id) FROM memories GROUP BY scope, kind, content
+            )
+            """
+        )
+        conn.execute(
+            """
+            DELETE FROM memories WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY scope, kind ORDER BY accessed_at DESC) AS rn
+                    FROM memories
+                ) WHERE rn > ?
+            )
+            """,
+            (max_entries,),
+        )
+        after = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+        conn.commit()
+    if after < before:
+        with closing(sqlite3.connect(path)) as conn:
+            conn.execute("VACUUM")
+    return {"before": before, "after": after}
+
+
+class ScopedMemoryStorage(Storage):
+    """crewai memory Storage holding one (scope, kind) partition of the shared SQLite file"""
+
+    def __init__(self, scope: str, kind: str, path: str = MEMORY_DB, max_entries: int = MEMORY_MAX_ENTRIES,
+                 ttl: float = MEMORY_TTL_SECONDS):
+        self.scope = scope
+        self.kind = kind
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def _insert(self, content: str, metadata: Any, datetime: Optional[str] = None, score: Optional[float] = None):
+        global _saves
+        now = time.time()
+        with _lock, _connect(self.path) as conn:
+            conn.execute(
+                """
+                INSERT INTO memories (scope, kind, content, metadata, terms, datetime, score, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (self.scope, self.kind, content, json.dumps(metadata, default=str), " ".join(_terms(content)),
+                 datetime, score, now, now),
+            )
+            # Keep this partition within its cap right away; compaction handles the rest
+            conn.execute(
+                """
+                DELETE FROM memories WHERE scope = ? AND kind = ? AND id NOT IN (
+                    SELECT id FROM memories WHERE scope = ? AND kind = ? ORDER BY accessed_at DESC LIMIT ?
+                )
+                """,
+                (self.scope, self.kind, self.scope, self.kind, self.max_entries),
+            )
+            conn.commit()
+            _saves += 1
+            due = _saves % MEMORY_COMPACT_EVERY == 0
+        if due:
+            compact(self.path, self.max_entries, self.ttl)
+
+    def save(self, value: Any, metadata: Dict[str, Any]) -> None:
+        self._insert(str(value), metadata)
+
+    def search(self, query: str, limit: int = 5, score_threshold: float = 0.6) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        query_terms = set(_terms(query))
+        with _lock, _connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT id, content, metadata, terms FROM memories WHERE scope = ? AND kind = ? AND created_at >= ?",
+                (self.scope, self.kind, time.time() - self.ttl),
+            ).fetchall()
+
+            scored = [(_similarity(query_terms, terms.split()), row_id, content, metadata)
+                      for row_id, content, metadata, terms in rows]
+            scored = sorted((item for item in scored if item[0] >= MIN_SCORE), reverse=True)[:limit]
+
+            if scored:
+                conn.executemany(
+                    "UPDATE memories SET accessed_at = ? WHERE id = ?",
+                    [(time.time(), row_id) for _, row_id, _, _ in scored],
+                )
+                conn.commit()
+
+        retrieval_latencies_ms.append((time.perf_counter() - started) * 1000)
+        return [
+            {"id": row_id, "content": content, "metadata": json.loads(metadata) if metadata else {}, "score": score}
+            for score, row_id, content, metadata in scored
+        ]
+
+    def reset(self) -> None:
+        with _lock, _connect(self.path) as conn:
+            conn.execute("DELETE FROM memories WHERE scope = ? AND kind = ?", (self.scope, self.kind))
+            conn.commit()
+
+
+class ScopedLongTermStorage(ScopedMemoryStorage):
+    """Same partitioned table, exposing the save/load interface LongTermMemory expects"""
+
+    def __init__(self, scope: str, **kwargs):
+        super().__init__(scope, "long_term", **kwargs)
+
+    def save(self, task_description: str, metadata: Dict[str, Any], datetime: str, score: float) -> None:  # type: ignore[override]
+        self._insert(task_description, metadata, datetime, score)
+
+    def load(self, task_description: str, latest_n: int) -> Optional[List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        with _lock, _connect(self.path) as conn:
+            rows = conn.execute(
+                """
+                SELECT metadata, datetime, score FROM memories
+                WHERE scope = ? AND kind = ? AND content = ? AND created_at >= ?
+                ORDER BY datetime DESC, score ASC
+                LIMIT ?
+                """,
+                (self.scope, self.kind, task_description, time.time() - self.ttl, latest_n),
+            ).fetchall()
+        retrieval_latencies_ms.append((time.perf_counter() - started) * 1000)
+        if not rows:
+            return None
+        return [{"metadata": json.loads(metadata), "datetime": datetime, "score": score}
+                for metadata, datetime, score in rows]
+
+
+def scoped_memories(scope: Optional[str]) -> dict:
+    """Crew keyword arguments wiring every crewai memory type to the given scope"""
+    scope = scope or "default"
+    return {
+        "short_term_memory": ShortTermMemory(storage=ScopedMemoryStorage(scope, "short_term")),
+        "entity_memory": EntityMemory(storage=ScopedMemoryStorage(scope, "entity")),
+        "long_term_memory": LongTermMemory(storage=ScopedLongTermStorage(scope)),
+    }
+
+
+def memory_report(path: str = MEMORY_DB) -> dict:
+    """Retrieval latency percentiles for this process and row counts per memory kind"""
+    latencies = sorted(retrieval_latencies_ms)
+    with _lock, _connect(path) as conn:
+        counts = dict(conn.execute("SELECT kind, COUNT(*) FROM memories GROUP BY kind").fetchall())
+        scopes = conn.execute("SELECT COUNT(DISTINCT scope) FROM memories").fetchone()[0]
+    return {
+        "retrievals": len(latencies),
+        "p50_retrieval_ms": latencies[len(latencies) // 2] if latencies else None,
+        "p95_retrieval_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        "entries": counts,
+        "scopes": scopes,
+    }
+
+
+def run_compaction():
+    """Compact the memory store (project script entry point)"""
+    print(json.dumps(compact(), indent=2))
@@ -0,0 +1,142 @@
+"""
+Tiered execution policy for the NotifyAgent crew.
+
+Every search first runs the cheap "fast" profile. Its SQL is checked
+statically (single read-only SELECT exposing the required columns) and then
+by its result set (RPC succeeds, columns present, sane row count). Only when
+a check fails is the search re-run with the "full" profile. Each attempt is
+appended to policy_metrics.jsonl so latency and escalation rates per profile
+can be reported with `policy_report`.
+"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
+METRICS_FILE = ROOT_DIR / "policy_metrics.jsonl"
+
+PROFILE_ORDER = ["fast", "full"]
+
+REQUIRED_COLUMNS = ["id", "name", "email", "phone", "years_of_experience", "language", "rating", "location", "distance_m"]
+
+MIN_ROWS = int(os.getenv("POLICY_MIN_ROWS", "0"))
+MAX_ROWS = int(os.getenv("POLICY_MAX_ROWS", "500"))
+
+WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|TRUNCATE|DROP|ALTER|CREATE|GRANT|REVOKE|COPY|MERGE|CALL|DO|VACUUM|REINDEX|COMMENT|LOCK|SET)\b",
+    re.IGNORECASE,
+)
+
+
+def _strip_literals(query: str) -> Optional[str]:
+    """Blank out quoted strings and identifiers; None when a quote is left open"""
+    out, quote = [], None
+    for ch in query:
+        if quote:
+            if ch == quote:
+                quote = None
+            out.append(" ")
+        elif ch in ("'", '"'):
+            quote = ch
+            out.append(" ")
+        else:
+            out.append(ch)
+    return None if quote else "".join(out)
+
+
+def validate_sql(query: str) -> List[str]:
+    """Static checks on the generated query; returns the list of problems found"""
+    if not query.strip():
+        return ["empty query"]
+
+    code = _strip_literals(query)
+    if code is None:
+        return ["unterminated string literal"]
+
+    problems = []
+    if not re.match(r"\s*(SELECT|WITH)\b", code, re.IGNORECASE):
+        problems.append("query is not a SELECT")
+    if ";" in code.strip().rstrip(";"):
+        problems.append("more than one statement")
+    if WRITE_KEYWORDS.search(code):
+        problems.append(f"not read-only ({WRITE_KEYWORDS.search(code).group(1).upper()})")  # type: ignore[union-attr]
+
+    depth = 0
+    for ch in code:
+        depth += ch == "("
+        depth -= ch == ")"
+        if depth < 0:
+            break
+    if depth != 0:
+        problems.append("unbalanced parentheses")
+
+    missing = [column for column in REQUIRED_COLUMNS if not re.search(rf"\b{column}\b", code, re.IGNORECASE)]
+    if missing:
+        problems.append(f"missing columns: {', '.join(missing)}")
+
+    return problems
+
+
+def validate_rows(rows, sql_problems: Optional[List[str]] = None, min_rows: int = MIN_ROWS, max_rows: int = MAX_ROWS) -> List[str]:
+    """
+    Checks on the result set returned by the execute_sql RPC. No workers
+    nearby is a legitimate answer, so an empty result only counts against a
+    query that already failed the static checks (`sql_problems`).
+    """
+    if not isinstance(rows, list):
+        return [f"unexpected result type {type(rows).__name__}"]
+    if not rows and sql_problems:
+        return ["no rows returned by a query that failed the static checks"]
+    if len(rows) < min_rows:
+        return [f"only {len(rows)} rows returned"]
+    if len(rows) > max_rows:
+        return [f"{len(rows)} rows returned (max {max_rows})"]
+    if rows:
+        missing = [column for column in REQUIRED_COLUMNS if column not in rows[0]]
+        if missing:
+            return [f"result is missing columns: {', '.join(missing)}"]
+    return []
+
+
+def record_attempt(profile: str, latency_s: float, problems: List[str], escalated: bool) -> dict:
+    entry = {
+        "ts": time.time(),
+        "profile": profile,
+        "latency_s": round(latency_s, 3),
+        "passed": not problems,
+        "problems": problems,
+        "escalated": escalated,
+    }
+    with open(METRICS_FILE, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def policy_report(path: Path = METRICS_FILE) -> dict:
+    """Per-profile attempt count, latency percentiles, pass rate and escalation rate"""
+    by_profile: dict = {}
+    if path.exists():
+        with open(path, "r") as f:
+            for line in f:
+                entry = json.loads(line)
+                by_profile.setdefault(entry["profile"], []).append(entry)
+
+    report = {}
+    for profile, entries in by_profile.items():
+        latencies = sorted(entry["latency_s"] for entry in entries)
+        report[profile] = {
+            "attempts": len(entries),
+            "p50_latency_s": latencies[len(latencies) // 2],
+            "p95_latency_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "pass_rate": sum(entry["passed"] for entry in entries) / len(entries),
+            "escalation_rate": sum(entry["escalated"] for entry in entries) / len(entries),
+        }
+    return report
+
+
+def report():
+    """Print the policy report (project script entry point)"""
+    print(json.dumps(policy_report(), indent=2))
@@ -5,11 +5,19 @@ from supabase import create_client, Client
 import os
 import json
 import re
+from notify_agent.cancellation import token, run_with_deadline
 
 url: str = str(os.environ.get("SUPABASE_URL"))
 key: str = str(os.environ.get("SUPABASE_KEY"))
 supabase: Client = create_client(url, key)
 
+# Denormalized search table from app_backend/migrations/add_employee_search.sql
+EMPLOYEE_SEARCH = os.getenv("EMPLOYEE_SEARCH", "0") == "1"
+
+EXPLORATION_EXHAUSTED = (
+    "Exploration time budget exhausted. Do not call any more tools; output the final SQL query now."
+)
+
 def normalize_sql(query: str) -> str:
     if not query:
         return ""
@@ -37,10 +45,13 @@ class ExecuteSQLTool(BaseTool):
     args_schema: Type[BaseModel] = ExecuteSQLInput
 
     def _run(self, query_string: str) -> str:
+        token.check()
+        if token.expired("exploration"):
+            return EXPLORATION_EXHAUSTED
         try:
             cleaned_query = normalize_sql(query_string)
-            response = (
-                supabase
+            response = run_with_deadline(
+                lambda: supabase
                 .rpc("execute_sql", {"query": cleaned_query})
                 .execute()
             )
@@ -85,6 +96,32 @@ table_to_schema_mapping = {
     """
 }
 
+if EMPLOYEE_SEARCH:
+    table_to_schema_mapping["employee_search"] = """
+    -- One row per employee, kept in sync with employees / employee_skills / skills.
+    -- Query this table alone for employee searches: no joins needed.
+    -- skills holds the exact skill_name values of the employee's skills; get the
+    -- candidate names from the skills table (SELECT skill_name FROM skills) and filter with
+    -- skills && ARRAY['Name 1', 'Name 2']::text[] (any of) or skills @> ARRAY[...]::text[] (all of).
+    create table public.employee_search (
+        id uuid not null,
+        name character varying(100) not null,
+        email character varying(255) not null,
+        phone character varying(20) null,
+        years_of_experience integer null,
+        language character varying(50) null,
+        rating numeric(2, 1) null,
+        status character varying(20) null,
+        location geography null,
+        skills text[] not null default '{}',
+        refreshed_at timestamp with time zone null default now(),
+        constraint employee_search_pkey primary key (id),
+        constraint employee_search_id_fkey foreign KEY (id) references employees (id) on delete CASCADE
+    ) TABLESPACE pg_default;
+    create index idx_employee_search_location on public.employee_search using gist (location);
+    create index idx_employee_search_skills on public.employee_search using gin (skills);
+    """
+
 class GetTableSchemaArgument(BaseModel):
     table_name: str = Field(
         ...,
@@ -99,6 +136,9 @@ class GetTableSchemaTool(BaseTool):
     args_schema: Type[BaseModel] = GetTableSchemaArgument
 
     def _run(self, table_name: str) -> str:
+        token.check()
+        if token.expired("exploration"):
+            return EXPLORATION_EXHAUSTED
         return table_to_schema_mapping[table_name]
 
 class ListTablesTool(BaseTool):
@@ -108,8 +148,16 @@ class ListTablesTool(BaseTool):
     )
 
     def _run(self) -> str:
-        return """
+        token.check()
+        if token.expired("exploration"):
+            return EXPLORATION_EXHAUSTED
+        tables = """
         - employees (Stores core employee details)
         - skills (Stores unique skills)
         - employee_skills (A junction table mapping employees to their skills using (employee_id, skill_id))
-        """
\ No newline at end of file
+        """
+        if EMPLOYEE_SEARCH:
+            tables += """- employee_search (Use this for employee searches: one row per employee with its skill names
+          as an array and an indexed location, so no joins are needed)
+        """
+        return tables
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Local span recorder for one crew run, exported as a Chrome trace.
+
+Every event the listener forwards to the SSE hub also goes through
+`tracer.record`. A "start" opens a span and the matching "complete" (same type
+and same crew/agent/task/tool/model name) closes it, timed with the crewai
+event's own timestamp. Anything else becomes an instant event. At the end of
+the run the spans are written to traces/<JOB_ID>/crew.json, next to the
+backend's spans for the same job; open it in chrome://tracing or Perfetto, or
+summarise many runs with the backend's trace_report.py.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
+
+LOCAL_TRACING = os.getenv("LOCAL_TRACING", "1") == "1"
+TRACE_DIR = Path(os.getenv("TRACE_DIR", str(ROOT_DIR / "traces")))
+
+# Field naming what a start/complete pair is about, per event type
+NAME_FIELDS = {
+    "crew": "crew_name",
+    "agent": "agent_role",
+    "task": "task_name",
+    "tool": "tool_name",
+    "llm": "model",
+    "reasoning": "agent_role",
+}
+
+# crewai handles events on worker threads; the run itself is sequential, so one track
+CREW_TID = 1
+
+# Large payload fields are left out of span args
+SKIPPED_ARGS = {"type", "action", "tool_output", "response", "reasoning", "task_desc", "agent_goal"}
+
+
+def _micros(timestamp: Optional[datetime]) -> int:
+    return int((timestamp.timestamp() if timestamp else time.time()) * 1_000_000)
+
+
+class Tracer:
+    def __init__(self, job_id: Optional[str] = None, enabled: bool = LOCAL_TRACING):
+        self.job_id = job_id or time.strftime("run-%Y%m%d-%H%M%S")
+        self.enabled = enabled
+        self.events: List[dict] = []
+        self._open: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, payload: dict, timestamp: Optional[datetime] = None):
+        """Turn one listener payload into a span boundary or an instant event"""
+        if not self.enabled:
+            return
+        event_type = payload.get("type", "event")
+        subject = payload.get(NAME_FIELDS.get(event_type, ""))
+        name = f"{event_type}: {subject}" if subject else event_type
+        key = (event_type, subject)
+        ts = _micros(timestamp)
+        args = {field: value for field, value in payload.items() if field not in SKIPPED_ARGS}
+
+        with self._lock:
+            if payload.get("action") == "start":
+                self._open.setdefault(key, []).append({
+                    "name": name, "cat": event_type, "ph": "X", "ts": ts,
+                    "pid": os.getpid(), "tid": CREW_TID, "args": args,
+                })
+            elif payload.get("action") == "complete" and self._open.get(key):
+                span = self._open[key].pop()
+                span["dur"] = max(ts - span["ts"], 0)
+                span["args"].update(args)
+                self.events.append(span)
+            else:
+                self.events.append({
+                    "name": f"{name} {payload.get('action', '')}".strip(), "cat": event_type, "ph": "i", "s": "p",
+                    "ts": ts, "pid": os.getpid(), "tid": CREW_TID, "args": args,
+                })
+
+    def save(self) -> Optional[Path]:
+        """Write the finished spans (plus still-open ones, cut at now) as a Chrome trace file"""
+        if not self.enabled:
+            return None
+        now = _micros(None)
+        with self._lock:
+            events = list(self.events)
+            for spans in self._open.values():
+                for span in spans:
+                    events.append({**span, "dur": now - span["ts"], "args": {**span["args"], "unfinished": True}})
+
+        trace_dir = TRACE_DIR.resolve()
+        path = (trace_dir / self.job_id / "crew.json").resolve()
+        # JOB_ID names the directory; it must not lead anywhere outside TRACE_DIR
+        if path.parent.parent != trace_dir:
+            print(f"Not writing trace for job id {self.job_id!r}: outside {trace_dir}")
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "crew"}}]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + sorted(events, key=lambda e: e["ts"]),
+                       "displayTimeUnit": "ms", "otherData": {"job_id": self.job_id}}, f)
+        return path
+
+
+tracer = Tracer(os.getenv("JOB_ID"))
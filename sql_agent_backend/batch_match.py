@@ -0,0 +1,187 @@
+"""
+Batch matching of many job postings without a crew run per posting.
+
+1. Each posting's skills are resolved lexically against the `skills` table
+   (whole-word match of the skill name in the posting text, plural-tolerant),
+   unless the posting already carries skill ids.
+2. Postings are grouped by (resolved skill set, CELL_DEG grid cell). A group
+   searches once from its centroid with a radius that covers every member.
+3. All groups go to the database in a single set-based query: a VALUES list
+   of groups joined to employees with ST_DWithin plus a skill filter.
+4. The candidates of each group are split per posting with an exact distance
+   and radius check, then ranked (see ranking.py).
+
+With the in-memory search index enabled, step 3 is answered by the index.
+"""
+import math
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ranking import RankWeights, rank_rows
+from search_index import CELL_DEG, SearchIndex, haversine_m
+
+SKILLS_CACHE_SECONDS = 300
+
+SKILLS_QUERY = "SELECT id, skill_name FROM skills"
+
+BATCH_QUERY = """
+WITH groups (group_id, lat, long, radius_m, skill_ids) AS (
+    VALUES {values}
+)
+SELECT g.group_id, e.id, e.name, e.email, e.phone, e.years_of_experience, e.language, e.rating, e.location,
+ST_Y(e.location::geometry) AS lat, ST_X(e.location::geometry) AS long
+FROM groups g
+JOIN employees e
+  ON ST_DWithin(e.location, ST_SetSRID(ST_MakePoint(g.long, g.lat), 4326)::geography, g.radius_m)
+WHERE EXISTS (
+    SELECT 1 FROM employee_skills es
+    WHERE es.employee_id = e.id AND es.skill_id = ANY(g.skill_ids)
+)
+"""
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+_skills_cache: Tuple[float, Dict[str, str]] = (0.0, {})
+
+
+def load_skills(supabase) -> Dict[str, str]:
+    """skill id -> skill name, cached for SKILLS_CACHE_SECONDS"""
+    global _skills_cache
+    loaded_at, skills = _skills_cache
+    if time.time() - loaded_at > SKILLS_CACHE_SECONDS:
+        rows = supabase.rpc("execute_sql", {"query": SKILLS_QUERY}).execute().data or []
+        skills = {str(row["id"]): row["skill_name"] for row in rows}
+        _skills_cache = (time.time(), skills)
+    return skills
+
+
+def _words(text: str) -> List[str]:
+    # "plumbers" and "plumber" resolve alike
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in WORD_RE.findall(text.lower())]
+
+
+def resolve_skills(text: str, skills: Dict[str, str]) -> List[str]:
+    """Ids of the skills whose name appears as a whole phrase in `text`"""
+    padded = f" {' '.join(_words(text))} "
+    return sorted(
+        skill_id for skill_id, name in skills.items()
+        if f" {' '.join(_words(name))} " in padded
+    )
+
+
+def _cell(lat: float, long: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(long / CELL_DEG)
+
+
+def group_postings(postings: List[dict]) -> List[dict]:
+    """Postings with the same skill set in the same grid cell, with a covering search circle"""
+    groups: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+    for posting in postings:
+        if posting["skill_ids"]:
+            key = (tuple(posting["skill_ids"]), _cell(posting["lat"], posting["long"]))
+            groups.setdefault(key, []).append(posting)
+
+    result = []
+    for (skill_ids, _), members in groups.items():
+        lat = float(np.mean([posting["lat"] for posting in members]))
+        long = float(np.mean([posting["long"] for posting in members]))
+        offsets = haversine_m(lat, long, np.array([p["lat"] for p in members]), np.array([p["long"] for p in members]))
+        radius_m = max(posting["radius_km"] * 1000 + offset for posting, offset in zip(members, offsets))
+        result.append({"skill_ids": list(skill_ids), "lat": lat, "long": long, "radius_m": radius_m, "postings": members})
+    return result
+
+
+def batch_query(groups: List[dict]) -> str:
+    values = []
+    for group_id, group in enumerate(groups):
+        # Ids are re-parsed as UUIDs so nothing but UUID text reaches the SQL
+        skill_ids = ", ".join(f"'{uuid.UUID(skill_id)}'" for skill_id in group["skill_ids"])
+        values.append(
+            f"({group_id}, {float(group['lat'])}::float8, {float(group['long'])}::float8, "
+            f"{float(group['radius_m'])}::float8, ARRAY[{skill_ids}]::uuid[])"
+        )
+    return BATCH_QUERY.format(values=",\n    ".join(values))
+
+
+def split_group(group: dict, rows: List[dict], k: int, weights: Optional[RankWeights]) -> Dict[str, dict]:
+    """Exact per-posting distance/radius filter and ranking of one group's candidates"""
+    lats = np.array([float(row["lat"]) for row in rows])
+    longs = np.array([float(row["long"]) for row in rows])
+    results = {}
+    for posting in group["postings"]:
+        distances = haversine_m(posting["lat"], posting["long"], lats, longs)
+        inside = np.flatnonzero(distances <= posting["radius_km"] * 1000)
+        candidates = [
+            {**{key: value for key, value in rows[i].items() if key not in ("group_id", "lat", "long")},
+             "distance_m": float(distances[i])}
+            for i in inside
+        ]
+        ranked, total = rank_rows(candidates, 1, k, weights)
+        results[posting["id"]] = {"candidates": ranked, "total": total}
+    return results
+
+
+def match_postings(
+    postings: List[dict],
+    supabase,
+    index: Optional[SearchIndex] = None,
+    k: int = 20,
+    weights: Optional[RankWeights] = None,
+) -> dict:
+    """
+    Candidates for every posting ({id, text, lat, long, radius_km, skill_ids?}),
+    matched in one set-based pass. Returns per-posting results and throughput.
+    """
+    started = time.perf_counter()
+    skills = load_skills(supabase)
+
+    for posting in postings:
+        posting["id"] = posting.get("id") or uuid.uuid4().hex
+        posting["skill_ids"] = sorted(
+            str(skill_id) for skill_id in posting.get("skill_ids") or [] if str(skill_id) in skills
+        ) or resolve_skills(posting["text"], skills)
+
+    groups = group_postings(postings)
+    results: Dict[str, dict] = {}
+
+    if index is not None:
+        source = "index"
+        for group in groups:
+            names = [skills[skill_id] for skill_id in group["skill_ids"]]
+            for posting in group["postings"]:
+                rows = index.search(posting["lat"], posting["long"], posting["radius_km"], names, k=None)
+                ranked, total = rank_rows(rows, 1, k, weights)
+                results[posting["id"]] = {"candidates": ranked, "total": total}
+    elif groups:
+        source = "sql"
+        rows = supabase.rpc("execute_sql", {"query": batch_query(groups)}).execute().data or []
+        by_group: Dict[int, List[dict]] = {}
+        for row in rows:
+            by_group.setdefault(int(row["group_id"]), []).append(row)
+        for group_id, group in enumerate(groups):
+            results.update(split_group(group, by_group.get(group_id, []), k, weights))
+    else:
+        source = "none"
+
+    took = time.perf_counter() - started
+    return {
+        "results": [
+            {
+                "id": posting["id"],
+                "skills": [skills[skill_id] for skill_id in posting["skill_ids"]],
+                "unresolved": not posting["skill_ids"],
+                **results.get(posting["id"], {"candidates": [], "total": 0}),
+            }
+            for posting in postings
+        ],
+        "postings": len(postings),
+        "groups": len(groups),
+        "source": source,
+        "took_ms": took * 1000,
+        "postings_per_second": len(postings) / took if took > 0 else None,
+    }
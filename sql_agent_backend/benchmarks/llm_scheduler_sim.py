@@ -0,0 +1,118 @@
+"""
+Simulate crews hammering one model through the LLM scheduler, against a mock provider.
+
+    python benchmarks/llm_scheduler_sim.py
+    python benchmarks/llm_scheduler_sim.py --calls 400 --rpm 600 --tpm 400000
+
+Runs the same mixed workload (voice / interactive / batch calls) twice:
+
+    direct      every call goes straight to the provider and retries 429s
+                with exponential backoff, like the crews do today
+    scheduled   every call holds a scheduler lease whose limits match the provider
+
+and prints 429 counts plus end-to-end latency percentiles per priority class.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_scheduler  # noqa: E402
+from llm_scheduler import LLMScheduler, MockProvider, ProviderRateLimited  # noqa: E402
+
+MODEL = "mock-model"
+MIX = [("voice", 0.2), ("interactive", 0.5), ("batch", 0.3)]
+
+
+def workload(calls: int, seed: int):
+    """(arrival offset s, priority, prompt tokens, output tokens) per call, arriving in a burst"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(calls):
+        priority = rng.choices([name for name, _ in MIX], [weight for _, weight in MIX])[0]
+        items.append((rng.uniform(0, 2.0), priority, rng.randint(300, 2500), rng.randint(50, 400)))
+    return items
+
+
+async def call_direct(provider: MockProvider, prompt: int, output: int):
+    backoff = 0.5
+    while True:
+        try:
+            return await provider.complete(prompt, output)
+        except ProviderRateLimited:
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+            backoff = min(backoff * 2, 20)
+
+
+async def call_scheduled(scheduler: LLMScheduler, provider: MockProvider, priority: str, prompt: int, output: int):
+    while True:
+        lease = await scheduler.acquire(MODEL, priority, prompt + output, timeout=600)
+        try:
+            used = await provider.complete(prompt, output)
+        except ProviderRateLimited:
+            scheduler.release(lease["lease"], prompt + output, throttled=True)
+            continue
+        scheduler.release(lease["lease"], used)
+        return used
+
+
+async def run(mode: str, items, args) -> dict:
+    provider = MockProvider(rpm=args.rpm, tpm=args.tpm, latency_s=args.latency, seed=args.seed)
+    llm_scheduler.LLM_LIMITS[MODEL] = {"rpm": args.rpm, "tpm": args.tpm, "concurrency": args.concurrency}
+    scheduler = LLMScheduler()
+    latencies = {name: [] for name, _ in MIX}
+
+    async def one(offset, priority, prompt, output):
+        await asyncio.sleep(offset)
+        started = time.perf_counter()
+        if mode == "direct":
+            await call_direct(provider, prompt, output)
+        else:
+            await call_scheduled(scheduler, provider, priority, prompt, output)
+        latencies[priority].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*item) for item in items))
+    return {
+        "wall_s": time.perf_counter() - started,
+        "rate_limited": provider.rate_limited,
+        "latencies": latencies,
+        "metrics": scheduler.metrics().get(MODEL) if mode == "scheduled" else None,
+    }
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--rpm", type=float, default=240)
+    parser.add_argument("--tpm", type=float, default=200000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    items = workload(args.calls, args.seed)
+    print(f"{args.calls} calls, provider limits {args.rpm:.0f} rpm / {args.tpm:.0f} tpm")
+    print(f"{'mode':<10} {'priority':<12} {'calls':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for mode in ("direct", "scheduled"):
+        random.seed(args.seed)
+        result = asyncio.run(run(mode, items, args))
+        for priority, values in result["latencies"].items():
+            print(f"{mode:<10} {priority:<12} {len(values):>6} {percentile(values, 0.5):>8.2f} "
+                  f"{percentile(values, 0.95):>8.2f} {max(values, default=float('nan')):>8.2f}")
+        print(f"{mode:<10} 429s: {result['rate_limited']}, wall {result['wall_s']:.1f} s")
+        if result["metrics"]:
+            print(f"{'':<10} granted: {result['metrics']['granted']}, throttled: {result['metrics']['throttled']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the ranking stage.
+
+    python benchmarks/ranking_bench.py              # 10k / 100k / 1M candidates
+    python benchmarks/ranking_bench.py --n 100000
+
+Times the scoring + top-k selection on prebuilt column arrays and, separately,
+the full rank_rows call, which is what /complete pays: most of it is reading
+the columns out of the result rows. Also checks the page against a full
+stable sort.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import RankWeights, rank_rows, score, top_k  # noqa: E402
+
+
+def synthetic_rows(n: int, rng: np.random.Generator):
+    distances = rng.uniform(0, 20000, n)
+    # Coarse ratings and experience so plenty of scores tie
+    ratings = rng.integers(0, 11, n) / 2
+    experience = rng.integers(0, 15, n)
+    return [
+        {
+            "id": str(uuid.UUID(int=int(rng.integers(0, 2**63)))),
+            "distance_m": float(distances[i]),
+            "rating": None if i % 50 == 0 else float(ratings[i]),
+            "years_of_experience": int(experience[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def bench(n: int, k: int, repeat: int):
+    rng = np.random.default_rng(42)
+    rows = synthetic_rows(n, rng)
+    weights = RankWeights()
+
+    distance = np.array([row["distance_m"] for row in rows])
+    rating = np.array([np.nan if row["rating"] is None else row["rating"] for row in rows])
+    experience = np.array([row["years_of_experience"] for row in rows], dtype=np.float64)
+    ids = np.array([row["id"] for row in rows])
+
+    stage_ms = best_of(lambda: top_k(score(distance, rating, experience, weights), ids, k), repeat)
+    full_ms = best_of(lambda: rank_rows(rows, 1, k, weights), repeat)
+
+    page, _ = rank_rows(rows, 2, k, weights)
+    scores = score(distance, rating, experience, weights)
+    reference = sorted(range(n), key=lambda i: (-scores[i], ids[i]))[k:2 * k]
+    assert [row["id"] for row in page] == [ids[i] for i in reference], "page differs from full sort"
+    assert page == rank_rows(rows, 2, k, weights)[0], "ranking is not reproducible"
+
+    print(f"{n:>9} candidates  score+top-{k}: {stage_ms:7.2f} ms   rank_rows: {full_ms:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for n in args.n:
+        bench(n, args.k, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
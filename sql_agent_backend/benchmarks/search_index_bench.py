@@ -0,0 +1,138 @@
+"""
+Benchmark the in-memory search index against the execute_sql RPC path.
+
+    python benchmarks/search_index_bench.py              # index only, 10k / 100k / 1M
+    python benchmarks/search_index_bench.py --rpc        # also time the RPC against SUPABASE_URL
+
+The index is filled with synthetic employees scattered around Bengaluru. The
+RPC numbers come from whatever data the configured database holds, so seed it
+to a comparable size before reading them side by side.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex  # noqa: E402
+
+CENTER = (12.9716, 77.5946)
+SKILLS = [
+    "Plumber", "Electrician", "Carpenter", "Painter", "Mason", "Welder", "Driver", "Cook",
+    "Cleaner", "Gardener", "Security Guard", "Mechanic", "Tailor", "Housekeeper", "Babysitter",
+]
+
+RPC_QUERY = (
+    "SELECT DISTINCT e.id, e.name, e.email, e.phone, e.years_of_experience, e.language, e.rating, e.location, "
+    "ST_Distance(e.location, ST_SetSRID(ST_MakePoint({long}, {lat}), 4326)::geography) AS distance_m "
+    "FROM employees e JOIN employee_skills es ON es.employee_id = e.id JOIN skills s ON s.id = es.skill_id "
+    "WHERE s.skill_name IN ({skills}) "
+    "AND ST_DWithin(e.location, ST_SetSRID(ST_MakePoint({long}, {lat}), 4326)::geography, {radius_m}) "
+    "ORDER BY distance_m LIMIT {k}"
+)
+
+
+def synthetic_rows(n: int, rng: np.random.Generator):
+    lats = CENTER[0] + rng.normal(0, 0.25, n)
+    longs = CENTER[1] + rng.normal(0, 0.25, n)
+    skill_counts = rng.integers(1, 4, n)
+    for i in range(n):
+        yield {
+            "id": str(uuid.UUID(int=int(rng.integers(0, 2**63)) << 64 | i)),
+            "name": f"Worker {i}",
+            "email": f"worker{i}@example.com",
+            "phone": None,
+            "years_of_experience": int(rng.integers(0, 30)),
+            "language": "English",
+            "rating": round(float(rng.uniform(1, 5)), 1),
+            "location": None,
+            "lat": float(lats[i]),
+            "long": float(longs[i]),
+            "skills": list(rng.choice(SKILLS, skill_counts[i], replace=False)),
+        }
+
+
+def random_queries(count: int, rng: np.random.Generator):
+    for _ in range(count):
+        yield {
+            "lat": CENTER[0] + float(rng.normal(0, 0.2)),
+            "long": CENTER[1] + float(rng.normal(0, 0.2)),
+            "radius_km": float(rng.choice([2, 5, 10, 25])),
+            "skills": list(rng.choice(SKILLS, int(rng.integers(1, 3)), replace=False)),
+            "k": 20,
+        }
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return f"p50 {np.percentile(samples, 50):9.1f} µs   p99 {np.percentile(samples, 99):9.1f} µs"
+
+
+def bench_index(n: int, queries: int, seed: int):
+    rng = np.random.default_rng(seed)
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    index.load(synthetic_rows(n, rng))
+    build = time.perf_counter() - started
+
+    timings, hits = [], 0
+    for query in random_queries(queries, rng):
+        started = time.perf_counter()
+        hits += len(index.search(**query))
+        timings.append(time.perf_counter() - started)
+
+    upserts = []
+    for row in synthetic_rows(1000, rng):
+        started = time.perf_counter()
+        index.upsert(row)
+        upserts.append(time.perf_counter() - started)
+
+    print(f"index  n={n:>9,}  build {build:6.2f}s  search {percentiles(timings)}  "
+          f"avg hits {hits / queries:5.1f}  upsert {percentiles(upserts)}")
+
+
+def bench_rpc(queries: int, seed: int):
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    rng = np.random.default_rng(seed)
+
+    timings = []
+    for query in random_queries(queries, rng):
+        sql = RPC_QUERY.format(
+            lat=query["lat"],
+            long=query["long"],
+            radius_m=query["radius_km"] * 1000,
+            skills=", ".join(f"'{skill}'" for skill in query["skills"]),
+            k=query["k"],
+        )
+        started = time.perf_counter()
+        supabase.rpc("execute_sql", {"query": sql}).execute()
+        timings.append(time.perf_counter() - started)
+
+    print(f"rpc    (database as configured)             search {percentiles(timings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--rpc", action="store_true", help="also time the execute_sql RPC path")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench_index(n, args.queries, args.seed)
+    if args.rpc:
+        bench_rpc(min(args.queries, 100), args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Maintenance job for the denormalized `employee_search` table.
+
+The table and its dirty-tracking triggers are created by
+app_backend/migrations/add_employee_search.sql. Writes to employees,
+employee_skills or skills only queue the employee; this job drains the queue
+through the `refresh_employee_search` RPC, on a timer and on demand when
+save_db registers a worker.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class EmployeeSearchMaintainer:
+    def __init__(self, supabase, batch_size: int = 1000):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.rows_refreshed = 0
+
+    def refresh(self) -> int:
+        """Rebuild every dirty row; returns how many rows were rebuilt"""
+        total = 0
+        # One drain at a time; concurrent callers would only contend on the same rows
+        with self._lock:
+            try:
+                while True:
+                    count = self.supabase.rpc("refresh_employee_search", {"batch_size": self.batch_size}).execute().data
+                    total += count or 0
+                    if not count or count < self.batch_size:
+                        break
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                self.rows_refreshed += total
+                self.last_refresh = time.time()
+        return total
+
+    def available(self) -> bool:
+        """Whether add_employee_search.sql has been run, i.e. its RPCs and tables exist"""
+        try:
+            self.backlog()
+            self.supabase.rpc("execute_sql", {"query": "SELECT id FROM employee_search_removed LIMIT 1"}).execute()
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    def backlog(self) -> dict:
+        rows = self.supabase.rpc("employee_search_backlog", {}).execute().data or [{}]
+        return rows[0]
+
+    def stats(self) -> dict:
+        return {
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+            "rows_refreshed": self.rows_refreshed,
+        }
+
+    def start_polling(self, interval: float = 10.0, on_refresh: Optional[Callable[[int], None]] = None):
+        """Catch up with writes that did not ask for a refresh (app_backend, manual SQL)"""
+        if self._poller is not None:
+            return
+
+        def poll():
+            while not self._stop.is_set():
+                try:
+                    count = self.refresh()
+                    if count:
+                        print(f"🔎 employee_search refreshed {count} rows", flush=True)
+                        if on_refresh:
+                            on_refresh(count)
+                except Exception as e:
+                    print(f"employee_search refresh failed: {e}", flush=True)
+                self._stop.wait(interval)
+
+        self._poller = threading.Thread(target=poll, name="employee-search-refresh", daemon=True)
+        self._poller.start()
@@ -0,0 +1,145 @@
+"""
+SSE event hub with a compact encoding layer.
+
+Each published event is encoded once for every subscriber:
+
+- long string fields (the full execute_sql result in `tool_output`, LLM
+  `response`, `reasoning`, ...) are cut to EVENT_FIELD_LIMIT characters,
+  or summarised as a row count when they are JSON arrays. The full body
+  stays fetchable from /events/body/{body_id} for a while.
+- the `data: ...` frame is serialised a single time and the same bytes are
+  queued for every connected client.
+- a client that falls behind gets a queued start event and its matching
+  complete event merged into one frame with `"coalesced": true`.
+"""
+import asyncio
+import json
+import os
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+EVENT_FIELD_LIMIT = int(os.getenv("EVENT_FIELD_LIMIT", "1000"))
+EVENT_BODY_CACHE = int(os.getenv("EVENT_BODY_CACHE", "512"))
+SUBSCRIBER_BACKLOG = 5000
+
+# Field that names the thing a start/complete pair is about, per event type
+PAIR_FIELDS = {
+    "crew": "crew_name",
+    "agent": "agent_role",
+    "task": "task_name",
+    "tool": "tool_name",
+    "llm": "model",
+    "reasoning": "agent_role",
+}
+
+
+def encode_frame(event: dict) -> bytes:
+    return f"data: {json.dumps(event, separators=(',', ':'), default=str)}\n\n".encode("utf-8")
+
+
+def pair_key(event: dict) -> Tuple[str, Optional[str]]:
+    event_type = event.get("type", "")
+    return event_type, event.get(PAIR_FIELDS.get(event_type, ""))
+
+
+def summarize(value: str, limit: int = EVENT_FIELD_LIMIT) -> str:
+    """Short stand-in for a long field: a row count for JSON arrays, else a prefix"""
+    stripped = value.lstrip()
+    if stripped.startswith("["):
+        try:
+            rows = json.loads(stripped)
+        except ValueError:
+            rows = None
+        if isinstance(rows, list):
+            preview = json.dumps(rows[:1], default=str)[:limit]
+            return f"{len(rows)} rows, first: {preview}"
+    return value[:limit] + "…"
+
+
+class Subscriber:
+    """One connected SSE client: a backlog of encoded frames plus a wakeup flag"""
+
+    def __init__(self):
+        self._frames: Deque[Tuple[Tuple[str, Optional[str]], dict, bytes]] = deque(maxlen=SUBSCRIBER_BACKLOG)
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict, frame: bytes):
+        key = pair_key(event)
+        if event.get("action") == "complete" and self._frames:
+            queued_key, queued, _ = self._frames[-1]
+            if queued_key == key and queued.get("action") == "start":
+                merged = {**queued, **event, "coalesced": True}
+                self._frames[-1] = (key, merged, encode_frame(merged))
+                return
+        self._frames.append((key, event, frame))
+        self._ready.set()
+
+    async def next_frame(self) -> bytes:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()[2]
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class EventHub:
+    def __init__(self, field_limit: int = EVENT_FIELD_LIMIT, body_cache: int = EVENT_BODY_CACHE):
+        self.field_limit = field_limit
+        self.body_cache = body_cache
+        self.subscribers: List[Subscriber] = []
+        self._bodies: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def compact(self, event: dict) -> dict:
+        """Replace oversized string fields with summaries, keeping the originals fetchable"""
+        large = {
+            field: value for field, value in event.items()
+            if isinstance(value, str) and len(value) > self.field_limit
+        }
+        if not large:
+            return event
+
+        body_id = uuid.uuid4().hex
+        self._bodies[body_id] = large
+        while len(self._bodies) > self.body_cache:
+            self._bodies.popitem(last=False)
+
+        compacted = dict(event)
+        for field, value in large.items():
+            compacted[field] = summarize(value, self.field_limit)
+        compacted["truncated"] = sorted(large)
+        compacted["body_url"] = f"/events/body/{body_id}"
+        return compacted
+
+    def publish(self, event: dict) -> int:
+        """Encode `event` once and queue it for every subscriber; returns the frame size"""
+        event = self.compact(event)
+        frame = encode_frame(event)
+        for subscriber in self.subscribers:
+            subscriber.push(event, frame)
+        return len(frame)
+
+    def body(self, body_id: str) -> Optional[Dict[str, str]]:
+        return self._bodies.get(body_id)
+
+
+class GzipStream:
+    """Incremental gzip for a streaming response; every frame is flushed so it reaches the client"""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, frame: bytes) -> bytes:
+        return self._compressor.compress(frame) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
@@ -0,0 +1,121 @@
+"""
+Search jobs and their cancellation.
+
+A job is one /complete call. It is cancelled when the /complete connection
+drops, when the last /events stream watching it closes (streams may connect
+before /complete creates the job), on an explicit
+POST /jobs/{job_id}/cancel, or when its deadline passes. Cancelling
+terminates the `crewai run` process group. Inside the crew, SIGTERM becomes
+a JobCancelled exception (see notify_agent.cancellation).
+"""
+import asyncio
+import os
+import re
+import signal
+import time
+import uuid
+from typing import Dict, Optional
+
+from provisional import ProvisionalCandidates
+
+# Exit status the crew uses when it stopped itself on a deadline
+EXIT_CANCELLED = 124
+
+TERMINATE_GRACE_SECONDS = 5
+
+# Client-chosen job ids must look like the ones we generate (uuid4 hex); they end up in paths and env vars
+JOB_ID_PATTERN = r"^[0-9a-f]{32}$"
+
+
+class JobExists(Exception):
+    """A job with this id is already running"""
+
+
+def valid_job_id(job_id: Optional[str]) -> bool:
+    return bool(job_id and re.match(JOB_ID_PATTERN, job_id))
+
+
+class Job:
+    def __init__(self, job_id: str, timeout: float):
+        self.id = job_id
+        self.started = time.time()
+        self.deadline = self.started + timeout
+        self.reason: Optional[str] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.watchers = 0
+        self.watched = False
+        # Employee rows seen in the crew's exploratory queries, streamed before the final result
+        self.provisional = ProvisionalCandidates()
+        self._cancelled = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str):
+        if not self.cancelled:
+            self.reason = reason
+            self._cancelled.set()
+            print(f"🛑 Job {self.id} cancelled: {reason}", flush=True)
+
+    def remaining(self) -> float:
+        return self.deadline - time.time()
+
+
+class JobRegistry:
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        # /events streams that named a job before /complete created it
+        self.pending_watchers: Dict[str, int] = {}
+
+    def create(self, job_id: Optional[str], timeout: float) -> Job:
+        if job_id is not None and not valid_job_id(job_id):
+            raise ValueError(f"Invalid job id {job_id!r}")
+        if job_id in self.jobs:
+            raise JobExists(job_id)
+        job = Job(job_id or uuid.uuid4().hex, timeout)
+        job.watchers = self.pending_watchers.pop(job.id, 0)
+        job.watched = job.watchers > 0
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        return self.jobs.get(job_id) if job_id else None
+
+    def remove(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def watch(self, job_id: Optional[str]):
+        job = self.get(job_id)
+        if job is not None:
+            job.watchers += 1
+            job.watched = True
+        elif valid_job_id(job_id):
+            self.pending_watchers[job_id] = self.pending_watchers.get(job_id, 0) + 1  # type: ignore[index]
+
+    def unwatch(self, job_id: Optional[str]):
+        """Called when an /events stream closes; the last watcher leaving cancels the job"""
+        job = self.get(job_id)
+        if job is None:
+            if job_id in self.pending_watchers:
+                self.pending_watchers[job_id] -= 1
+                if self.pending_watchers[job_id] <= 0:
+                    del self.pending_watchers[job_id]
+            return
+        job.watchers -= 1
+        if job.watched and job.watchers <= 0:
+            job.cancel("event stream closed")
+
+
+async def terminate(process: asyncio.subprocess.Process, grace: float = TERMINATE_GRACE_SECONDS):
+    """SIGTERM the process group, then SIGKILL whatever is still running after `grace` seconds"""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        await asyncio.wait_for(process.wait(), grace)
+    except asyncio.TimeoutError:
+        os.killpg(process.pid, signal.SIGKILL)
+        await process.wait()
+    except ProcessLookupError:
+        pass
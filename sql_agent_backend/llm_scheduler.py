@@ -0,0 +1,296 @@
+"""
+Global LLM scheduler shared by every crew.
+
+Crews ask for a lease (POST /llm/acquire) before each LLM call and hand it
+back afterwards (POST /llm/release). Per model, a lease is only granted when
+
+- the requests-per-minute and tokens-per-minute buckets both have room,
+- fewer than LLM_MAX_CONCURRENCY calls are in flight, and
+- the model is not cooling down after the provider returned a 429.
+
+Waiting calls are served by priority class (voice < interactive < batch), with
+ageing so a batch job still moves eventually under sustained voice traffic.
+Limits come from LLM_LIMITS, e.g. {"gpt-4.1-mini": {"rpm": 500, "tpm": 200000}};
+models not listed use LLM_DEFAULT_RPM / LLM_DEFAULT_TPM.
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+PRIORITIES = {"voice": 0, "interactive": 1, "batch": 2}
+
+LLM_LIMITS: Dict[str, dict] = json.loads(os.getenv("LLM_LIMITS", "{}"))
+LLM_DEFAULT_RPM = float(os.getenv("LLM_DEFAULT_RPM", "500"))
+LLM_DEFAULT_TPM = float(os.getenv("LLM_DEFAULT_TPM", "200000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_LEASE_SECONDS = float(os.getenv("LLM_LEASE_SECONDS", "120"))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "60"))
+
+# A waiting call gains one priority class per AGEING_SECONDS spent in the queue
+AGEING_SECONDS = 30.0
+THROTTLE_BACKOFF_SECONDS = 2.0
+THROTTLE_BACKOFF_MAX_SECONDS = 60.0
+WAIT_SAMPLES = 1000
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` units per second up to one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full one)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class Waiter:
+    def __init__(self, priority: str, tokens: int, seq: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def rank(self, now: float):
+        return (PRIORITIES[self.priority] - (now - self.enqueued) / AGEING_SECONDS, self.seq)
+
+
+class Lease:
+    def __init__(self, model: str, priority: str, tokens: int, ttl: float):
+        self.id = uuid.uuid4().hex
+        self.model = model
+        self.priority = priority
+        self.tokens = tokens
+        self.expires = time.monotonic() + ttl
+
+
+class ModelQueue:
+    """Waiters, buckets and in-flight leases for one model"""
+
+    def __init__(self, model: str):
+        limits = LLM_LIMITS.get(model, {})
+        self.model = model
+        self.requests = TokenBucket(float(limits.get("rpm", LLM_DEFAULT_RPM)))
+        self.tokens = TokenBucket(float(limits.get("tpm", LLM_DEFAULT_TPM)))
+        self.max_concurrency = int(limits.get("concurrency", LLM_MAX_CONCURRENCY))
+        self.waiters: List[Waiter] = []
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.backoff = THROTTLE_BACKOFF_SECONDS
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.granted = {name: 0 for name in PRIORITIES}
+        self.throttled = 0
+        self.expired = 0
+        self.waits_ms: Dict[str, Deque[float]] = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITIES}
+
+    def delay(self, tokens: int, now: float) -> float:
+        """Seconds before a call of `tokens` could start, or 0 when it can start now"""
+        if self.in_flight >= self.max_concurrency:
+            return float("inf")  # woken by a release instead
+        return max(self.cooldown_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+
+class LLMScheduler:
+    def __init__(self, lease_ttl: float = LLM_LEASE_SECONDS):
+        self.lease_ttl = lease_ttl
+        self.models: Dict[str, ModelQueue] = {}
+        self.leases: Dict[str, Lease] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> ModelQueue:
+        if model not in self.models:
+            self.models[model] = ModelQueue(model)
+        return self.models[model]
+
+    async def acquire(self, model: str, priority: str = "interactive", tokens: int = 0,
+                      timeout: float = LLM_ACQUIRE_TIMEOUT) -> dict:
+        """Wait for a lease; raises asyncio.TimeoutError when none was granted within `timeout`, and leaves nothing queued or held when cancelled"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {', '.join(PRIORITIES)}")
+
+        queue = self._queue(model)
+        waiter = Waiter(priority, max(tokens, 0), next(self._seq))
+        queue.waiters.append(waiter)
+        self._dispatch(queue)
+        try:
+            lease = await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Timed out, or the client disconnected and the request was cancelled
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the wait ended; give it straight back
+                self.release(waiter.future.result().id)
+            else:
+                waiter.future.cancel()
+                if waiter in queue.waiters:
+                    queue.waiters.remove(waiter)
+                    self._dispatch(queue)  # it may have been holding up smaller calls
+            raise
+
+        waited_ms = (time.monotonic() - waiter.enqueued) * 1000
+        queue.waits_ms[priority].append(waited_ms)
+        return {"lease": lease.id, "waited_ms": waited_ms, "expires_in": self.lease_ttl}
+
+    def release(self, lease_id: str, tokens: Optional[int] = None, throttled: bool = False) -> bool:
+        """
+        Return a lease. `tokens` is what the call actually used, which settles the
+        estimate taken at acquire time; `throttled` means the provider answered 429.
+        """
+        lease = self.leases.pop(lease_id, None)
+        if lease is None:
+            return False
+
+        queue = self._queue(lease.model)
+        now = time.monotonic()
+        queue.in_flight -= 1
+        if tokens is not None:
+            difference = lease.tokens - tokens
+            if difference > 0:
+                queue.tokens.give(difference, now)
+            else:
+                queue.tokens.take(-difference, now)
+
+        if throttled:
+            queue.throttled += 1
+            queue.cooldown_until = now + queue.backoff
+            queue.backoff = min(queue.backoff * 2, THROTTLE_BACKOFF_MAX_SECONDS)
+        else:
+            queue.backoff = THROTTLE_BACKOFF_SECONDS
+
+        self._dispatch(queue)
+        return True
+
+    def _expire_leases(self, now: float):
+        """Leases whose client died without releasing stop holding a concurrency slot"""
+        for lease in [lease for lease in self.leases.values() if lease.expires <= now]:
+            del self.leases[lease.id]
+            queue = self._queue(lease.model)
+            queue.in_flight -= 1
+            queue.expired += 1
+
+    def _dispatch(self, queue: ModelQueue):
+        now = time.monotonic()
+        self._expire_leases(now)
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+
+        while queue.waiters:
+            # Strict order: a large high-priority call is not overtaken by small low-priority ones
+            waiter = min(queue.waiters, key=lambda w: w.rank(now))
+            delay = queue.delay(waiter.tokens, now)
+            if delay > 0:
+                if delay != float("inf"):
+                    loop = asyncio.get_running_loop()
+                    queue.timer = loop.call_later(delay, self._dispatch, queue)
+                elif self.leases:
+                    # Waiting on a release, but also on the oldest lease expiring
+                    expires = min(lease.expires for lease in self.leases.values()) - now
+                    queue.timer = asyncio.get_running_loop().call_later(max(expires, 0), self._dispatch, queue)
+                return
+
+            queue.waiters.remove(waiter)
+            queue.requests.take(1, now)
+            queue.tokens.take(waiter.tokens, now)
+            queue.in_flight += 1
+
+            lease = Lease(queue.model, waiter.priority, waiter.tokens, self.lease_ttl)
+            self.leases[lease.id] = lease
+            queue.granted[waiter.priority] += 1
+            waiter.future.set_result(lease)
+
+    def metrics(self) -> dict:
+        """Queue depth per priority, in-flight calls, bucket levels and wait percentiles per model"""
+        now = time.monotonic()
+        self._expire_leases(now)
+        report = {}
+        for model, queue in self.models.items():
+            depth = {name: 0 for name in PRIORITIES}
+            for waiter in queue.waiters:
+                depth[waiter.priority] += 1
+
+            waits = {}
+            for name, samples in queue.waits_ms.items():
+                ordered = sorted(samples)
+                waits[name] = {
+                    "p50_ms": ordered[len(ordered) // 2] if ordered else None,
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None,
+                }
+
+            queue.requests._refill(now)
+            queue.tokens._refill(now)
+            report[model] = {
+                "queue_depth": depth,
+                "in_flight": queue.in_flight,
+                "max_concurrency": queue.max_concurrency,
+                "requests_available": round(queue.requests.level, 2),
+                "tokens_available": round(queue.tokens.level),
+                "cooldown_s": round(max(queue.cooldown_until - now, 0), 2),
+                "granted": queue.granted,
+                "throttled": queue.throttled,
+                "expired_leases": queue.expired,
+                "wait": waits,
+            }
+        return report
+
+
+class ProviderRateLimited(Exception):
+    """The mock provider's equivalent of an HTTP 429"""
+
+
+class MockProvider:
+    """
+    Local stand-in for an LLM provider. Like the real ones it meters requests
+    and tokens with continuously replenishing per-minute limits, answers after a
+    latency proportional to the tokens generated, and raises ProviderRateLimited
+    (its 429) instead of answering when a limit is exceeded.
+    """
+
+    def __init__(self, rpm: float = 60, tpm: float = 40000, latency_s: float = 0.2, seconds_per_token: float = 0.0005,
+                 seed: int = 0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.latency_s = latency_s
+        self.seconds_per_token = seconds_per_token
+        self.rate_limited = 0
+        self.served = 0
+        self._random = random.Random(seed)
+
+    async def complete(self, prompt_tokens: int, output_tokens: int) -> int:
+        """Simulate one call; returns the total tokens used"""
+        now = time.monotonic()
+        total = prompt_tokens + output_tokens
+        if self.requests.wait_time(1, now) > 0 or self.tokens.wait_time(total, now) > 0:
+            self.rate_limited += 1
+            await asyncio.sleep(0.01)
+            raise ProviderRateLimited("429 Too Many Requests")
+
+        self.requests.take(1, now)
+        self.tokens.take(total, now)
+        jitter = self._random.uniform(0.8, 1.2)
+        await asyncio.sleep((self.latency_s + output_tokens * self.seconds_per_token) * jitter)
+        self.served += 1
+        return total
@@ -1,15 +1,25 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-import subprocess
+from pydantic import BaseModel, Field
 import os
 import json
 import asyncio
+import shutil
 import time
-from typing import List
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from search_index import EmployeeSearchFeed, SearchIndex, fetch_snapshot, params_from_sql
+from event_hub import EventHub, GzipStream
+from jobs import EXIT_CANCELLED, JOB_ID_PATTERN, Job, JobExists, JobRegistry, terminate
+from llm_scheduler import LLM_ACQUIRE_TIMEOUT, LLMScheduler
+from ranking import RANK_PAGE_SIZE, RankWeights, rank_rows
+from batch_match import load_skills, match_postings
+from tracing import JobTrace
+from standing_queries import StandingQueryIndex, fetch_open_postings
+from employee_search import EmployeeSearchMaintainer
+from provisional import candidate_rows, search_radius_m
 
 load_dotenv()
 
@@ -31,18 +41,160 @@ app.add_middleware(
 AGENTS_DIR = os.path.abspath("./agents")
 
 SQL_BASE_DIR = os.path.join(AGENTS_DIR, "notify_agent")
-SQL_INPUT_FILE = os.path.join(SQL_BASE_DIR, "input.json")
-SQL_OUTPUT_FILE = os.path.join(SQL_BASE_DIR, "output.txt")
+# Each search gets its own input.json/output.txt under runs/<job_id>, passed to the crew as JOB_DIR.
+# Relative to SQL_BASE_DIR: crewai resolves a task's output_file against its working directory.
+SQL_RUNS_DIR = "runs"
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(SQL_BASE_DIR, "traces"))
 
-# SSE clients list
-clients: List[asyncio.Queue] = []
+# Running searches, cancelled when their client goes away or time runs out
+jobs = JobRegistry()
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+LOCATION_DEADLINE_SECONDS = float(os.getenv("LOCATION_DEADLINE_SECONDS", "10"))
+JOB_POLL_SECONDS = 0.5
+
+# SSE clients, each event encoded once for all of them
+hub = EventHub()
+SSE_GZIP = os.getenv("SSE_GZIP", "1") == "1"
+
+# Shared rate limits and priorities for every crew's LLM calls
+llm_scheduler = LLMScheduler()
+
+# Optional in-process mirror of employees / employee_skills / skills (fed by employee_search when it is enabled)
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX", "0") == "1"
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+search_index: Optional[SearchIndex] = SearchIndex() if SEARCH_INDEX_ENABLED else None
+
+# Open job postings as predicates that every newly registered worker is matched against
+STANDING_QUERIES_ENABLED = os.getenv("STANDING_QUERIES", "1") == "1"
+STANDING_QUERIES_REFRESH_SECONDS = float(os.getenv("STANDING_QUERIES_REFRESH_SECONDS", "60"))
+standing_queries = StandingQueryIndex()
+
+# Denormalized employee_search table (app_backend/migrations/add_employee_search.sql), refreshed from its dirty queue.
+# Off until that migration has been run; turned off again at startup if its table or RPCs are missing.
+EMPLOYEE_SEARCH_ENABLED = os.getenv("EMPLOYEE_SEARCH", "0") == "1"
+EMPLOYEE_SEARCH_REFRESH_SECONDS = float(os.getenv("EMPLOYEE_SEARCH_REFRESH_SECONDS", "10"))
+employee_search = EmployeeSearchMaintainer(supabase, int(os.getenv("EMPLOYEE_SEARCH_BATCH_SIZE", "1000")))
+
+
+@app.on_event("startup")
+def check_employee_search():
+    global EMPLOYEE_SEARCH_ENABLED
+    if EMPLOYEE_SEARCH_ENABLED and not employee_search.available():
+        EMPLOYEE_SEARCH_ENABLED = False
+        print(f"employee_search disabled, run app_backend/migrations/add_employee_search.sql first: "
+              f"{employee_search.last_error}", flush=True)
+
+
+@app.on_event("startup")
+def start_search_index():
+    if search_index is not None:
+        # Follow employee_search's changes when that table is maintained, else re-read the whole join
+        if EMPLOYEE_SEARCH_ENABLED:
+            fetch_changes = EmployeeSearchFeed(supabase).poll
+        else:
+            fetch_changes = lambda: (fetch_snapshot(supabase), None)
+        search_index.start_polling(fetch_changes, SEARCH_INDEX_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+def start_standing_queries():
+    if STANDING_QUERIES_ENABLED:
+        standing_queries.start_polling(lambda: fetch_open_postings(supabase), STANDING_QUERIES_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+def start_employee_search():
+    if EMPLOYEE_SEARCH_ENABLED:
+        employee_search.start_polling(EMPLOYEE_SEARCH_REFRESH_SECONDS)
 
 class CompleteRequest(BaseModel):
     input: str
     user_id: str
+    job_id: Optional[str] = Field(None, pattern=JOB_ID_PATTERN)
+    page: int = Field(1, ge=1)
+    page_size: Optional[int] = Field(None, ge=1)  # None: every row, ranked
+    weights: Optional[RankWeights] = None
+
+class IndexSearchRequest(BaseModel):
+    lat: float
+    long: float
+    radius_km: float = 10
+    skills: List[str] = []
+    k: Optional[int] = 20
+    match_all: bool = False
+
+class IndexSQLRequest(BaseModel):
+    query: str
+
+class BatchPosting(BaseModel):
+    id: Optional[str] = None
+    text: str
+    lat: float
+    long: float
+    radius_km: float = 10
+    skill_ids: List[str] = []
+
+class BatchMatchRequest(BaseModel):
+    postings: List[BatchPosting]
+    k: int = RANK_PAGE_SIZE
+    weights: Optional[RankWeights] = None
+
+class StandingPosting(BaseModel):
+    id: str
+    lat: float
+    long: float
+    radius_km: float = 10
+    skill_ids: List[str] = []
+    employer_id: Optional[str] = None
+    title: Optional[str] = None
+
+class NewWorker(BaseModel):
+    id: str
+    lat: Optional[float] = None
+    long: Optional[float] = None
+    skill_ids: List[str] = []
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    years_of_experience: Optional[int] = None
+    language: Optional[str] = None
+    rating: Optional[float] = None
+
+class LLMAcquireRequest(BaseModel):
+    model: str
+    priority: str = "interactive"
+    tokens: int = 0
+    timeout: float = LLM_ACQUIRE_TIMEOUT
+
+class LLMReleaseRequest(BaseModel):
+    lease: str
+    tokens: Optional[int] = None
+    throttled: bool = False
 
 @app.post("/complete")
-def complete(req: CompleteRequest):
+async def complete(req: CompleteRequest, request: Request):
+    try:
+        job = jobs.create(req.job_id, JOB_TIMEOUT_SECONDS)
+    except JobExists:
+        raise HTTPException(409, f"Job {req.job_id} is already running")
+    trace = JobTrace(job.id, TRACE_DIR)
+    try:
+        with trace.span("complete", user_id=req.user_id):
+            return await run_search_job(job, req, request, trace)
+    finally:
+        jobs.remove(job.id)
+        shutil.rmtree(os.path.join(SQL_BASE_DIR, SQL_RUNS_DIR, job.id), ignore_errors=True)
+        if len(job.provisional) and not job.provisional.reconciled:
+            publish_reconcile(job, job.provisional.discard())
+        if job.provisional.first_at:
+            trace.mark("first_candidate", job.provisional.first_at, candidates=len(job.provisional))
+        trace.save()
+
+
+async def run_search_job(job: Job, req: CompleteRequest, request: Request, trace: JobTrace):
+    job_dir = os.path.join(SQL_RUNS_DIR, job.id)
+    input_file = os.path.join(SQL_BASE_DIR, job_dir, "input.json")
+    output_file = os.path.join(SQL_BASE_DIR, job_dir, "output.txt")
+
     try:    
         # for now static, it must be dynamic
         user_id = req.user_id
@@ -59,54 +211,125 @@ def complete(req: CompleteRequest):
 
         print(query)
 
-        response = (
-            supabase
-            .rpc("get_employer_location", {"uid": user_id})
-            .execute()
-        )
+        with trace.span("location_rpc"):
+            response = await asyncio.wait_for(
+                asyncio.to_thread(
+                    lambda: supabase
+                    .rpc("get_employer_location", {"uid": user_id})
+                    .execute()
+                ),
+                min(LOCATION_DEADLINE_SECONDS, job.remaining())
+            )
 
         print(response)
 
         lat, long = response.data['lat'], response.data['lng'] # type: ignore
         print(lat,long)
-        with open(SQL_INPUT_FILE, "w") as f:
+        if lat is not None and long is not None:
+            job.provisional.origin = (float(lat), float(long))
+        job.provisional.weights = req.weights
+        os.makedirs(os.path.dirname(input_file), exist_ok=True)
+        with trace.span("write_input"), open(input_file, "w") as f:
             json.dump({
                 "input": req.input,
                 "lat": lat,
-                "long": long
+                "long": long,
+                "user_id": user_id
             }, f)
+    except asyncio.TimeoutError:
+        raise HTTPException(504, "Employer location lookup timed out")
     except Exception as e:
         print("hello")
         print(e)
         raise HTTPException(500, f"Failed to write input.json: {e}")
 
-    try:
-        print(f"🚀 Running SQL agent with prompt: {req.input}")
-        subprocess.run(
-            ["crewai", "run"],
+    # A stale result must never be mistaken for this job's
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+    print(f"🚀 Running SQL agent with prompt: {req.input} (job {job.id})")
+    with trace.span("subprocess_start"):
+        job.process = await asyncio.create_subprocess_exec(
+            "crewai", "run",
             cwd=SQL_BASE_DIR,
-            check=True,
-            text=True,
-            timeout=300
+            env={**os.environ, "JOB_ID": job.id, "JOB_DEADLINE": str(job.deadline), "JOB_DIR": job_dir,
+                 # The crew only points the agent at employee_search when the backend found it
+                 "EMPLOYEE_SEARCH": "1" if EMPLOYEE_SEARCH_ENABLED else "0"},
+            start_new_session=True
         )
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(500, f"CrewAI failed: {e.stderr}")
-    except subprocess.TimeoutExpired:
+    with trace.span("crew_run") as span:
+        await supervise(job, request)
+        span["returncode"] = job.process.returncode
+
+    if job.cancelled:
+        raise HTTPException(504 if job.reason == "deadline exceeded" else 499, f"Search cancelled: {job.reason}")
+    if job.process.returncode == EXIT_CANCELLED:
         raise HTTPException(504, "CrewAI execution timed out")
+    if job.process.returncode != 0:
+        raise HTTPException(500, f"CrewAI failed with exit code {job.process.returncode}")
 
-    if not os.path.exists(SQL_OUTPUT_FILE):
+    # `crewai run` reports the crew's own exit status as success, so a crew
+    # that stopped itself on the deadline shows up as a missing result
+    if not os.path.exists(output_file):
+        if job.remaining() <= 0:
+            raise HTTPException(504, "CrewAI execution timed out")
         raise HTTPException(500, "output.txt not found")
 
-    with open(SQL_OUTPUT_FILE, "r") as f:
+    with trace.span("read_output"), open(output_file, "r") as f:
         content = f.read()
-        return {"result": content if content != "null" else [] }
+
+    try:
+        with trace.span("parse_output"):
+            rows = json.loads(content) or []
+    except ValueError:
+        return {"result": content, "job_id": job.id}
+    if not isinstance(rows, list):
+        return {"result": rows, "job_id": job.id}
+
+    # Clients that do not page get the whole result, as before ranking existed
+    page_size = req.page_size or len(rows)
+    with trace.span("rank", rows=len(rows)):
+        ranked, total = rank_rows(rows, req.page, page_size, req.weights)
+    publish_reconcile(job, job.provisional.reconcile(ranked))
+    return {"result": ranked, "total": total, "page": req.page, "page_size": req.page_size, "job_id": job.id}
+
+
+async def supervise(job: Job, request: Request):
+    """Wait for the crew, stopping it as soon as nobody is waiting for the result or time is up"""
+    process = job.process
+    while True:
+        try:
+            await asyncio.wait_for(process.wait(), JOB_POLL_SECONDS) # type: ignore[union-attr]
+            return
+        except asyncio.TimeoutError:
+            pass
+
+        if await request.is_disconnected():
+            job.cancel("client disconnected")
+        elif job.remaining() <= 0:
+            job.cancel("deadline exceeded")
+
+        if job.cancelled:
+            await terminate(process) # type: ignore[arg-type]
+            return
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "No running job with this id")
+    job.cancel("cancelled by client")
+    return {"status": "ok"}
 
 
 @app.get("/events")
-async def events(request: Request):
-    """SSE endpoint for real-time event streaming"""
-    queue = asyncio.Queue()
-    clients.append(queue)
+async def events(request: Request, job_id: Optional[str] = None):
+    """SSE endpoint for real-time event streaming; with job_id, closing the stream cancels that search"""
+    subscriber = hub.subscribe()
+    jobs.watch(job_id)
+    gzip = SSE_GZIP and "gzip" in request.headers.get("accept-encoding", "")
+    stream = GzipStream() if gzip else None
 
     async def event_generator():
         try:
@@ -115,29 +338,242 @@ async def events(request: Request):
                     print("❌ Client disconnected")
                     break
 
-                event = await queue.get()
+                frame = await subscriber.next_frame()
 
-                payload = f"data: {json.dumps(event)}\n\n"
-
-                # ✅ LOG EXACTLY WHEN YOU SEND
-                print(f"📤 [{time.strftime('%H:%M:%S')}] Sent event → {event}", flush=True)
-
-                yield payload
+                yield stream.compress(frame) if stream else frame
 
         finally:
-            clients.remove(queue)
+            hub.unsubscribe(subscriber)
+            jobs.unwatch(job_id)
             print("🧹 Client queue removed", flush=True)
 
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
     return StreamingResponse(
         event_generator(),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers=headers
     )
 
 
+@app.get("/events/body/{body_id}")
+def event_body(body_id: str):
+    """Full text of the fields that were truncated in an SSE event"""
+    body = hub.body(body_id)
+    if body is None:
+        raise HTTPException(404, "Event body expired or unknown")
+    return body
+
+
 @app.post("/emit")
 async def emit(event: dict):
     """Emit event to all connected SSE clients"""
-    for queue in clients:
-        await queue.put(event)
+    # Read the exploratory rows before the hub cuts tool_output down to a summary
+    job = jobs.get(event.get("job_id"))
+    candidates = []
+    if job is not None and event.get("tool_name") == "execute_sql" and event.get("action") == "complete":
+        candidates = job.provisional.add(candidate_rows(event.get("tool_output")), search_radius_m(event.get("tool_args")))
+
+    size = hub.publish(event)
+
+    print(f"📤 [{time.strftime('%H:%M:%S')}] {event.get('type')}/{event.get('action')} "
+          f"→ {len(hub.subscribers)} client(s), {size} B", flush=True)
+
+    if candidates:
+        publish_provisional(job, candidates) # type: ignore[arg-type]
+
+    return {"status": "ok"}
+
+
+def publish_provisional(job: Job, rows: List[dict]):
+    """Push newly seen candidates of a running search, before the crew has finished"""
+    ranked, _ = rank_rows(rows, 1, len(rows), job.provisional.weights)
+    hub.publish({
+        "type": "candidates",
+        "action": "provisional",
+        "job_id": job.id,
+        "candidates": ranked,
+        "seen": len(job.provisional),
+        "elapsed_ms": round((time.time() - job.started) * 1000),
+    })
+    print(f"👀 Job {job.id}: {len(rows)} provisional candidates ({len(job.provisional)} so far)", flush=True)
+
+
+def publish_reconcile(job: Job, outcome: dict):
+    """Tell clients which provisional candidates the final result kept and which to remove"""
+    first_at = job.provisional.first_at
+    hub.publish({
+        "type": "candidates",
+        "action": "reconcile",
+        "job_id": job.id,
+        **outcome,
+        "time_to_first_candidate_ms": round((first_at - job.started) * 1000) if first_at else None,
+    })
+
+
+def require_search_index() -> SearchIndex:
+    if search_index is None:
+        raise HTTPException(503, "Search index is disabled (set SEARCH_INDEX=1)")
+    return search_index
+
+
+@app.post("/index/search")
+def index_search(req: IndexSearchRequest):
+    """Nearest workers with the given skills, answered from the in-memory index"""
+    index = require_search_index()
+    started = time.perf_counter()
+    rows = index.search(req.lat, req.long, req.radius_km, req.skills, req.k, req.match_all)
+    return {"rows": rows, "took_ms": (time.perf_counter() - started) * 1000}
+
+
+@app.post("/index/sql")
+def index_sql(req: IndexSQLRequest):
+    """Answer a generated search query from the index when its shape is recognised"""
+    index = require_search_index()
+    params = params_from_sql(req.query)
+    if params is None:
+        return {"matched": False}
+
+    started = time.perf_counter()
+    rows = index.search(**params)
+    return {"matched": True, "rows": rows, "took_ms": (time.perf_counter() - started) * 1000}
+
+
+@app.post("/index/employees")
+def index_upsert(employee: dict):
+    """Push a single changed employee (id, lat, long, skills, ...) into the index"""
+    require_search_index().upsert(employee)
+    return {"status": "ok"}
+
+
+@app.delete("/index/employees/{employee_id}")
+def index_remove(employee_id: str):
+    require_search_index().remove(employee_id)
+    return {"status": "ok"}
+
+
+@app.get("/index/stats")
+def index_stats():
+    return require_search_index().stats()
+
+
+def require_employee_search() -> EmployeeSearchMaintainer:
+    if not EMPLOYEE_SEARCH_ENABLED:
+        raise HTTPException(503, "employee_search maintenance is disabled (set EMPLOYEE_SEARCH=1)")
+    return employee_search
+
+
+@app.post("/employee_search/refresh")
+async def employee_search_refresh():
+    """Rebuild the dirty employee_search rows now, so a just-saved worker is searchable immediately"""
+    maintainer = require_employee_search()
+    started = time.perf_counter()
+    try:
+        count = await asyncio.to_thread(maintainer.refresh)
+    except Exception as e:
+        raise HTTPException(500, f"employee_search refresh failed: {e}")
+    return {"refreshed": count, "took_ms": (time.perf_counter() - started) * 1000}
+
+
+@app.get("/employee_search/stats")
+async def employee_search_stats():
+    maintainer = require_employee_search()
+    backlog = await asyncio.to_thread(maintainer.backlog)
+    return {**maintainer.stats(), **backlog}
+
+
+@app.post("/match/batch")
+def match_batch(req: BatchMatchRequest):
+    """Candidates for many job postings at once, from one set-based spatial join instead of a crew run each"""
+    if not req.postings:
+        raise HTTPException(400, "No postings given")
+    result = match_postings([posting.model_dump() for posting in req.postings], supabase, search_index, req.k, req.weights)
+    print(f"📦 Matched {result['postings']} postings in {result['groups']} groups via {result['source']}: "
+          f"{result['took_ms']:.0f} ms, {result['postings_per_second'] or 0:.1f} postings/s")
+    return result
+
+
+@app.post("/standing/postings")
+def standing_register(posting: StandingPosting):
+    """Register (or update) an open posting right away instead of waiting for the next sync"""
+    standing_queries.register(posting.model_dump())
+    return {"status": "ok"}
+
+
+@app.delete("/standing/postings/{posting_id}")
+def standing_remove(posting_id: str):
+    standing_queries.remove(posting_id)
+    return {"status": "ok"}
+
+
+@app.post("/standing/postings/{posting_id}/refresh")
+def standing_refresh(posting_id: str):
+    """Re-read one posting after app_backend created, edited or deleted it; registered only while open"""
+    try:
+        rows = fetch_open_postings(supabase, posting_id)
+    except ValueError:
+        raise HTTPException(400, "posting_id must be a UUID")
+    if rows:
+        standing_queries.register(rows[0])
+    else:
+        standing_queries.remove(posting_id)
+    return {"open": bool(rows)}
+
+
+@app.get("/standing/stats")
+def standing_stats():
+    return standing_queries.stats()
+
+
+@app.post("/standing/workers")
+async def standing_new_worker(worker: NewWorker):
+    """Match one newly saved worker against every open posting and push the hits to SSE clients"""
+    if worker.lat is None or worker.long is None:
+        return {"matches": []}
+
+    hits = standing_queries.match(worker.lat, worker.long, worker.skill_ids)
+    skills = await asyncio.to_thread(load_skills, supabase)
+    skill_names = [skills.get(skill_id, skill_id) for skill_id in worker.skill_ids]
+
+    if search_index is not None:
+        search_index.upsert({**worker.model_dump(), "skills": skill_names})
+
+    # Every /events subscriber receives these, so the worker is only identified, never described;
+    # the employer looks the worker up through app_backend
+    for hit in hits:
+        hub.publish({
+            "type": "standing_match",
+            "action": "match",
+            "posting_id": hit["posting_id"],
+            "employer_id": hit["employer_id"],
+            "title": hit["title"],
+            "distance_m": hit["distance_m"],
+            "skills": [skills.get(skill_id, skill_id) for skill_id in hit["skill_ids"]],
+            "worker": {"id": worker.id, "skills": skill_names},
+        })
+
+    print(f"📣 Worker {worker.id} matched {len(hits)} open postings")
+    return {"matches": hits}
+
+
+@app.post("/llm/acquire")
+async def llm_acquire(req: LLMAcquireRequest):
+    """Wait for a slot to call `model`; voice calls are served before interactive, interactive before batch"""
+    try:
+        return await llm_scheduler.acquire(req.model, req.priority, req.tokens, req.timeout)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(503, f"No LLM slot for {req.model} within {req.timeout:.0f}s")
+
+
+@app.post("/llm/release")
+def llm_release(req: LLMReleaseRequest):
+    return {"released": llm_scheduler.release(req.lease, req.tokens, req.throttled)}
+
 
-    return {"status": "ok"}
\ No newline at end of file
+@app.get("/llm/metrics")
+def llm_metrics():
+    return llm_scheduler.metrics()
@@ -0,0 +1,145 @@
+"""
+Provisional candidates for a running search.
+
+While the crew explores, its execute_sql calls (LIMIT 15) already return
+employee rows. /emit picks them out of the tool output before it is
+compacted for SSE, dedupes them by employee id per job and pushes the new
+ones as `candidates/provisional` events. Only rows of queries that filter
+on skills and on a radius are pushed, and only when they are inside that
+radius; a look at the whole employees table is not a candidate list. Once
+the final page is in, `reconcile` reports which provisional candidates made
+it (kept), which did not (dropped) and how many rows on the page were never
+shown before (added).
+"""
+import binascii
+import json
+import re
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+from search_index import haversine_m
+
+# Rows that look like employees rather than skills or aggregates
+CANDIDATE_FIELDS = ("id", "name")
+
+_SKILL_FILTER = re.compile(r"\bWHERE\b.*\b(?:skill_name|skills)\b", re.I | re.S)
+_RADIUS = re.compile(r"\s*(\d+(?:\.\d+)?)\s*")
+
+
+def search_radius_m(tool_args) -> Optional[float]:
+    """
+    Radius in meters of an execute_sql call's ST_DWithin filter, or None when the
+    query does not filter on both skills and distance.
+    """
+    if isinstance(tool_args, str):
+        try:
+            tool_args = json.loads(tool_args)
+        except ValueError:
+            return None
+    query = tool_args.get("query_string") if isinstance(tool_args, dict) else None
+    if not isinstance(query, str) or not _SKILL_FILTER.search(query):
+        return None
+
+    start = re.search(r"\bST_DWithin\s*\(", query, re.I)
+    if start is None:
+        return None
+    # Top-level arguments of the call: ST_DWithin(location, <point>, <meters>[, use_spheroid])
+    args, depth, begin = [], 0, start.end()
+    for i in range(start.end(), len(query)):
+        if query[i] == "(":
+            depth += 1
+        elif query[i] == ")" and depth:
+            depth -= 1
+        elif query[i] in ",)" and not depth:
+            args.append(query[begin:i])
+            begin = i + 1
+            if query[i] == ")":
+                break
+    radius = _RADIUS.fullmatch(args[2]) if len(args) >= 3 else None
+    return float(radius.group(1)) if radius else None
+
+
+def candidate_rows(tool_output) -> List[dict]:
+    """Employee-like rows from an execute_sql tool output (a JSON string or an already parsed list)"""
+    rows = tool_output
+    if isinstance(tool_output, str):
+        stripped = tool_output.lstrip()
+        if not stripped.startswith("["):
+            return []  # "SQL execution failed: ...", exploration budget notices, ...
+        try:
+            rows = json.loads(stripped)
+        except ValueError:
+            return []
+    if not isinstance(rows, list):
+        return []
+    return [row for row in rows if isinstance(row, dict) and all(row.get(field) for field in CANDIDATE_FIELDS)]
+
+
+def point_from_ewkb(value) -> Optional[Tuple[float, float]]:
+    """(lat, long) of a PostGIS point as PostgREST returns it (hex EWKB), None for anything else"""
+    if not isinstance(value, str) or len(value) < 42:
+        return None
+    try:
+        raw = binascii.unhexlify(value)
+    except (binascii.Error, ValueError):
+        return None
+    endian = "<" if raw[0] == 1 else ">"
+    (geometry_type,) = struct.unpack(f"{endian}I", raw[1:5])
+    offset = 9 if geometry_type & 0x20000000 else 5  # SRID present
+    if geometry_type & 0xFF != 1 or len(raw) < offset + 16:
+        return None
+    long, lat = struct.unpack(f"{endian}dd", raw[offset:offset + 16])
+    return lat, long
+
+
+class ProvisionalCandidates:
+    def __init__(self):
+        self.origin: Optional[Tuple[float, float]] = None  # job location, set once it is known
+        self.weights = None  # the job's RankWeights, so provisional rows are ordered like the final ones
+        self.rows: Dict[str, dict] = {}
+        self.first_at: Optional[float] = None
+        self.reconciled = False
+
+    def add(self, rows: List[dict], radius_m: Optional[float]) -> List[dict]:
+        """
+        Remember rows not seen before in this job that lie within `radius_m` (the
+        query's search radius, None if it had none) and return them, with distance_m filled in.
+        """
+        if radius_m is None:
+            return []
+        new = []
+        for row in rows:
+            employee_id = str(row["id"])
+            if employee_id in self.rows:
+                continue
+            row = dict(row)
+            if row.get("distance_m") is None and self.origin is not None:
+                point = point_from_ewkb(row.get("location"))
+                if point is not None:
+                    row["distance_m"] = round(float(haversine_m(*self.origin, *point)), 1)
+            if not isinstance(row.get("distance_m"), (int, float)) or row["distance_m"] > radius_m:
+                continue
+            self.rows[employee_id] = row
+            new.append(row)
+        if new and self.first_at is None:
+            self.first_at = time.time()
+        return new
+
+    def reconcile(self, final_rows: List[dict]) -> dict:
+        """Compare what was shown provisionally with the final page the client receives"""
+        self.reconciled = True
+        final_ids = {str(row.get("id")) for row in final_rows}
+        return {
+            "kept": [employee_id for employee_id in self.rows if employee_id in final_ids],
+            "dropped": [employee_id for employee_id in self.rows if employee_id not in final_ids],
+            "added": len(final_ids - self.rows.keys()),
+        }
+
+    def discard(self) -> dict:
+        """The search failed or was cancelled: none of the provisional candidates stand"""
+        self.reconciled = True
+        return {"kept": [], "dropped": list(self.rows), "added": 0}
+
+    def __len__(self):
+        return len(self.rows)
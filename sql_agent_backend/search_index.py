@@ -0,0 +1,732 @@
+"""In-process spatial + skill index mirroring employees / employee_skills / skills.
+
+Answers "workers with skills S within R km of (lat, long), top-k by distance"
+without going through the `execute_sql` RPC. Coordinates live in NumPy arrays
+bucketed on a fixed lat/long grid, and every skill keeps a packed bitset over
+employee ordinals.
+"""
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# ~5.5 km cells; a 10 km search touches at most a handful of rows of cells
+CELL_DEG = 0.05
+LON_CELLS = int(360 / CELL_DEG) + 2
+LAT_OFFSET = int(90 / CELL_DEG) + 1
+LON_OFFSET = int(180 / CELL_DEG) + 1
+
+# Rebuild the sorted grid once this many ordinals were added since the last build
+PENDING_REBUILD_THRESHOLD = 4096
+
+RESULT_COLUMNS = ["id", "name", "email", "phone", "years_of_experience", "language", "rating", "location"]
+
+SNAPSHOT_PAGE_SIZE = 5000
+
+# How far back each change-feed poll looks past the newest refreshed_at it has seen
+FEED_OVERLAP_SECONDS = 30
+# How long refresh_employee_search() keeps the ids of removed employees
+REMOVED_RETENTION_SECONDS = 24 * 3600
+
+SNAPSHOT_QUERY = """
+SELECT e.id, e.name, e.email, e.phone, e.years_of_experience, e.language, e.rating, e.location,
+ST_Y(e.location::geometry) AS lat, ST_X(e.location::geometry) AS long,
+COALESCE(array_agg(s.skill_name) FILTER (WHERE s.skill_name IS NOT NULL), '{{}}') AS skills
+FROM employees e
+LEFT JOIN employee_skills es ON es.employee_id = e.id
+LEFT JOIN skills s ON s.id = es.skill_id
+WHERE e.location IS NOT NULL AND e.id > '{after}'
+GROUP BY e.id
+ORDER BY e.id
+LIMIT {limit}
+"""
+
+FEED_QUERY = """
+SELECT id, name, email, phone, years_of_experience, language, rating, location,
+ST_Y(location::geometry) AS lat, ST_X(location::geometry) AS long, skills, refreshed_at
+FROM employee_search
+WHERE refreshed_at >= {since} AND (refreshed_at, id) > ({after_stamp}, {after_id})
+ORDER BY refreshed_at, id
+LIMIT {limit}
+"""
+
+REMOVED_QUERY = """
+SELECT id, removed_at
+FROM employee_search_removed
+WHERE removed_at >= {since} AND (removed_at, id) > ({after_stamp}, {after_id})
+ORDER BY removed_at, id
+LIMIT {limit}
+"""
+
+
+def _cell_key(lat, long):
+    lat_idx = np.floor(np.asarray(lat) / CELL_DEG).astype(np.int64) + LAT_OFFSET
+    lon_idx = np.floor(np.asarray(long) / CELL_DEG).astype(np.int64) + LON_OFFSET
+    return lat_idx * LON_CELLS + lon_idx
+
+
+def haversine_m(lat, long, lats, longs):
+    """Great-circle distance in meters from one point to arrays of points (degrees)."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(longs) - np.radians(long)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SearchIndex:
+    """Mirror of the employee search join, kept current by `sync`/`upsert`/`remove`."""
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._reset(capacity)
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_sync: Optional[float] = None
+
+    def _reset(self, capacity: int):
+        capacity = max(8, capacity + (-capacity % 8))
+        self._size = 0
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._long = np.zeros(capacity, dtype=np.float64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._skills: Dict[str, np.ndarray] = {}
+        self._records: List[Optional[dict]] = []
+        self._ordinal_by_id: Dict[str, int] = {}
+        self._grid_keys = np.zeros(0, dtype=np.int64)
+        self._grid_order = np.zeros(0, dtype=np.int64)
+        self._grid_size = 0
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._ordinal_by_id)
+
+    # ---------- maintenance ----------
+
+    def _grow(self, needed: int):
+        capacity = len(self._lat)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - len(self._lat)
+        self._lat = np.concatenate([self._lat, np.zeros(extra)])
+        self._long = np.concatenate([self._long, np.zeros(extra)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for name, bits in self._skills.items():
+            self._skills[name] = np.concatenate([bits, np.zeros(extra // 8, dtype=np.uint8)])
+
+    def _set_skill(self, name: str, ordinal: int, value: bool):
+        bits = self._skills.get(name)
+        if bits is None:
+            if not value:
+                return
+            bits = np.zeros(len(self._lat) // 8, dtype=np.uint8)
+            self._skills[name] = bits
+        mask = np.uint8(0x80 >> (ordinal & 7))
+        if value:
+            bits[ordinal >> 3] |= mask
+        else:
+            bits[ordinal >> 3] &= ~mask
+
+    def _rebuild_grid(self):
+        keys = _cell_key(self._lat[:self._size], self._long[:self._size])
+        order = np.argsort(keys, kind="stable")
+        self._grid_keys = keys[order]
+        self._grid_order = order
+        self._grid_size = self._size
+
+    def _append(self, row: dict) -> int:
+        ordinal = self._size
+        self._grow(ordinal + 1)
+        self._size += 1
+        self._lat[ordinal] = float(row["lat"])
+        self._long[ordinal] = float(row["long"])
+        self._alive[ordinal] = True
+        for name in row.get("skills") or []:
+            self._set_skill(name, ordinal, True)
+        record = {column: row.get(column) for column in RESULT_COLUMNS}
+        record["id"] = str(record["id"])
+        record["skills"] = list(row.get("skills") or [])
+        self._records.append(record)
+        self._ordinal_by_id[record["id"]] = ordinal
+        return ordinal
+
+    def _tombstone(self, ordinal: int):
+        self._alive[ordinal] = False
+        record = self._records[ordinal]
+        for name in record["skills"] if record else []:
+            self._set_skill(name, ordinal, False)
+        self._records[ordinal] = None
+        self._dead += 1
+
+    def load(self, rows: Iterable[dict]):
+        """Replace the whole index with `rows` (dicts with id, lat, long, skills, ...)."""
+        rows = [row for row in rows if row.get("lat") is not None and row.get("long") is not None]
+        with self._lock:
+            self._reset(len(rows))
+            for row in rows:
+                self._append(row)
+            self._rebuild_grid()
+            self.last_sync = time.time()
+
+    def upsert(self, row: dict):
+        """Insert or update a single employee; coordinates and skills may change."""
+        if row.get("lat") is None or row.get("long") is None:
+            self.remove(row["id"])
+            return
+        with self._lock:
+            ordinal = self._ordinal_by_id.pop(str(row["id"]), None)
+            if ordinal is not None:
+                self._tombstone(ordinal)
+            self._append(row)
+            if self._size - self._grid_size >= PENDING_REBUILD_THRESHOLD:
+                self._rebuild_grid()
+
+    def remove(self, employee_id: str):
+        with self._lock:
+            ordinal = self._ordinal_by_id.pop(str(employee_id), None)
+            if ordinal is not None:
+                self._tombstone(ordinal)
+
+    def sync(self, rows: Iterable[dict]):
+        """Apply a full snapshot incrementally: only changed or removed employees are touched."""
+        self.apply(rows, None)
+
+    def apply(self, rows: Iterable[dict], removed: Optional[Iterable[str]]):
+        """
+        Apply changed `rows` and the ids of `removed` employees; with removed=None, `rows` is a
+        full snapshot and everyone missing from it is removed. The rows are compared with the
+        index before taking the lock, so searches only wait while the actual changes go in.
+        """
+        rows = list(rows)
+        if not self._ordinal_by_id:
+            self.load(rows)
+            return
+
+        with self._lock:
+            known = list(self._ordinal_by_id) if removed is None else []
+        changed = [row for row in rows if row.get("lat") is not None and row.get("long") is not None and self._changed(row)]
+        gone = {str(row["id"]) for row in rows if row.get("lat") is None or row.get("long") is None}
+        gone.update(str(employee_id) for employee_id in removed or [])
+        if removed is None:
+            gone.update(set(known) - {str(row["id"]) for row in rows})
+
+        with self._lock:
+            for row in changed:
+                self.upsert(row)
+            for employee_id in gone:
+                self.remove(employee_id)
+            if self._dead > max(1024, self._size // 4):
+                self.load([self._row(ordinal) for ordinal in self._ordinal_by_id.values()])
+            elif self._grid_size != self._size:
+                self._rebuild_grid()
+            self.last_sync = time.time()
+
+    def _row(self, ordinal: int) -> dict:
+        row = dict(self._records[ordinal])  # type: ignore[arg-type]
+        row["lat"] = self._lat[ordinal]
+        row["long"] = self._long[ordinal]
+        return row
+
+    def _changed(self, row: dict) -> bool:
+        """Whether `row` differs from the index; lock-free, a concurrent upsert at worst makes it answer True"""
+        ordinal = self._ordinal_by_id.get(str(row["id"]))
+        record = self._records[ordinal] if ordinal is not None else None
+        if record is None:
+            return True
+        if float(row["lat"]) != self._lat[ordinal] or float(row["long"]) != self._long[ordinal]:
+            return True
+        if sorted(row.get("skills") or []) != sorted(record["skills"]):
+            return True
+        return any(row.get(column) != record[column] for column in RESULT_COLUMNS if column != "id")
+
+    # ---------- queries ----------
+
+    def _spatial_candidates(self, lat: float, long: float, radius_m: float) -> np.ndarray:
+        dlat = radius_m / EARTH_RADIUS_M * 180 / np.pi
+        coslat = max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+        dlon = min(dlat / coslat, 180.0)
+
+        lat_lo, lat_hi = _cell_key(lat - dlat, 0) // LON_CELLS, _cell_key(lat + dlat, 0) // LON_CELLS
+        lon_lo = int(_cell_key(0, long - dlon) % LON_CELLS)
+        lon_hi = int(_cell_key(0, long + dlon) % LON_CELLS)
+
+        slices = []
+        for lat_idx in range(int(lat_lo), int(lat_hi) + 1):
+            lo = np.searchsorted(self._grid_keys, lat_idx * LON_CELLS + lon_lo, side="left")
+            hi = np.searchsorted(self._grid_keys, lat_idx * LON_CELLS + lon_hi, side="right")
+            if hi > lo:
+                slices.append(self._grid_order[lo:hi])
+
+        # Ordinals appended since the last grid build are scanned directly
+        if self._size > self._grid_size:
+            slices.append(np.arange(self._grid_size, self._size, dtype=np.int64))
+
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def _skill_mask(self, ordinals: np.ndarray, skills: List[str], match_all: bool) -> np.ndarray:
+        bytes_idx = ordinals >> 3
+        shifts = (7 - (ordinals & 7)).astype(np.uint8)
+        mask = np.full(len(ordinals), match_all, dtype=bool)
+        for name in skills:
+            bits = self._skills.get(name)
+            if bits is None:
+                if match_all:
+                    return np.zeros(len(ordinals), dtype=bool)
+                continue
+            has = ((bits[bytes_idx] >> shifts) & 1).astype(bool)
+            mask = mask & has if match_all else mask | has
+        return mask
+
+    def search(
+        self,
+        lat: float,
+        long: float,
+        radius_km: float,
+        skills: Optional[List[str]] = None,
+        k: Optional[int] = 20,
+        match_all: bool = False,
+        min_rating: Optional[float] = None,
+        min_experience: Optional[int] = None,
+    ) -> List[dict]:
+        """Employees within `radius_km` having any (or all) of `skills`, nearest first."""
+        radius_m = radius_km * 1000.0
+        with self._lock:
+            ordinals = self._spatial_candidates(lat, long, radius_m)
+            ordinals = ordinals[self._alive[ordinals]]
+            if skills:
+                ordinals = ordinals[self._skill_mask(ordinals, skills, match_all)]
+            if min_rating is not None or min_experience is not None:
+                keep = [self._passes(ordinal, min_rating, min_experience) for ordinal in ordinals]
+                ordinals = ordinals[np.asarray(keep, dtype=bool)]
+
+            distances = haversine_m(lat, long, self._lat[ordinals], self._long[ordinals])
+            inside = distances <= radius_m
+            ordinals, distances = ordinals[inside], distances[inside]
+
+            if k is not None and len(ordinals) > k:
+                top = np.argpartition(distances, k - 1)[:k]
+                ordinals, distances = ordinals[top], distances[top]
+            order = np.lexsort((ordinals, distances))
+
+            results = []
+            for i in order:
+                record = dict(self._records[ordinals[i]])  # type: ignore[arg-type]
+                record.pop("skills")
+                record["distance_m"] = float(distances[i])
+                results.append(record)
+            return results
+
+    def _passes(self, ordinal: int, min_rating, min_experience) -> bool:
+        record = self._records[ordinal]
+        # NULL never satisfies `>=` in SQL
+        rating, experience = record["rating"], record["years_of_experience"]  # type: ignore[index]
+        if min_rating is not None and (rating is None or float(rating) < min_rating):
+            return False
+        if min_experience is not None and (experience is None or int(experience) < min_experience):
+            return False
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "employees": len(self._ordinal_by_id),
+                "ordinals": self._size,
+                "tombstones": self._dead,
+                "pending": self._size - self._grid_size,
+                "skills": len(self._skills),
+                "last_sync": self.last_sync,
+            }
+
+    # ---------- refresh ----------
+
+    def start_polling(self, fetch_changes: Callable[[], Tuple[List[dict], Optional[List[str]]]], interval: float = 30.0):
+        """
+        Keep the index current by applying what `fetch_changes` returns every `interval` seconds:
+        (changed rows, removed ids) from a change feed, or (full snapshot, None).
+        """
+        if self._poller is not None:
+            return
+
+        def poll():
+            while not self._stop.is_set():
+                try:
+                    started = time.perf_counter()
+                    rows, removed = fetch_changes()
+                    self.apply(rows, removed)
+                    print(f"🗂️  Search index synced: {len(rows)} rows fetched, {len(self)} employees "
+                          f"in {time.perf_counter() - started:.2f}s", flush=True)
+                except Exception as e:
+                    print(f"Search index sync failed: {e}", flush=True)
+                self._stop.wait(interval)
+
+        self._poller = threading.Thread(target=poll, name="search-index-poller", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+        self._poller = None
+
+
+def fetch_snapshot(supabase) -> List[dict]:
+    """Page through the whole employee/skill join with the `execute_sql` RPC (without employee_search)."""
+    rows: List[dict] = []
+    after = "00000000-0000-0000-0000-000000000000"
+    while True:
+        query = SNAPSHOT_QUERY.format(after=after, limit=SNAPSHOT_PAGE_SIZE)
+        page = supabase.rpc("execute_sql", {"query": " ".join(query.split())}).execute().data or []
+        rows.extend(page)
+        if len(page) < SNAPSHOT_PAGE_SIZE:
+            return rows
+        after = page[-1]["id"]
+
+class EmployeeSearchFeed:
+    """
+    Changes to the denormalized employee_search table since the previous poll.
+
+    refresh_employee_search() stamps every row it rebuilds with refreshed_at and
+    records employees it drops in employee_search_removed, so a poll reads only
+    what changed after the newest timestamp already seen. The first poll reads
+    the whole table.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.loaded = False
+        self.rows_since: Optional[str] = None
+        self.removed_since: Optional[str] = None
+        self.polled_at: Optional[float] = None
+
+    def _pages(self, query: str, since: Optional[str], stamp: str) -> Tuple[List[dict], Optional[str]]:
+        rows: List[dict] = []
+        # refreshed_at is the rebuilding transaction's start; one that commits late may carry
+        # a stamp older than rows already seen, so every poll looks back FEED_OVERLAP_SECONDS
+        since_sql = f"'{since}'::timestamptz - interval '{FEED_OVERLAP_SECONDS} seconds'" if since else "'-infinity'"
+        after = (since_sql, "'00000000-0000-0000-0000-000000000000'")
+        while True:
+            sql = query.format(since=since_sql, after_stamp=after[0], after_id=after[1], limit=SNAPSHOT_PAGE_SIZE)
+            page = self.supabase.rpc("execute_sql", {"query": " ".join(sql.split())}).execute().data or []
+            rows.extend(page)
+            if len(page) < SNAPSHOT_PAGE_SIZE:
+                break
+            after = (f"'{page[-1][stamp]}'::timestamptz", f"'{page[-1]['id']}'")
+        newest = max((row[stamp] for row in rows), key=_timestamp, default=since)
+        return rows, newest
+
+    def poll(self) -> Tuple[List[dict], Optional[List[str]]]:
+        # employee_search_removed only keeps a day of removals; after a longer outage start over
+        if self.polled_at is not None and time.monotonic() - self.polled_at > REMOVED_RETENTION_SECONDS:
+            self.loaded = False
+        if not self.loaded:
+            rows, self.rows_since = self._pages(FEED_QUERY, None, "refreshed_at")
+            self.removed_since = self.rows_since
+            self.loaded = True
+            self.polled_at = time.monotonic()
+            return rows, None
+        removed, self.removed_since = self._pages(REMOVED_QUERY, self.removed_since, "removed_at")
+        rows, self.rows_since = self._pages(FEED_QUERY, self.rows_since, "refreshed_at")
+        self.polled_at = time.monotonic()
+        return rows, [row["id"] for row in removed]
+
+
+def _timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+# ---------- SQL shape recognition for the crew's final query ----------
+#
+# Only one query shape is answered from the index; it is matched as a whitelist,
+# so any other clause, column or predicate falls back to execute_sql:
+#
+#   SELECT [DISTINCT] <RESULT_COLUMNS>, ST_Distance(location, <point>) AS distance_m
+#   FROM employee_search | employees JOIN employee_skills ON ... JOIN skills ON ...
+#   WHERE <one skill filter> AND ST_DWithin(location, <point>, <meters>)
+#     [AND rating >= x] [AND years_of_experience >= n] [AND location IS NOT NULL]
+#   [ORDER BY distance_m [ASC] [LIMIT n]]
+#
+# location and <point> must both be geography, so the ST_DWithin radius is in meters.
+
+SEARCH_COLUMNS = RESULT_COLUMNS + ["distance_m"]
+EMPLOYEE_TABLES = {"employees", "employee_search"}
+TABLE_COLUMNS = {
+    "employees": set(RESULT_COLUMNS),
+    "employee_search": set(RESULT_COLUMNS) | {"skills"},
+    "employee_skills": {"employee_id", "skill_id"},
+    "skills": {"id", "skill_name"},
+}
+# The only join accepted: employees -> employee_skills -> skills on their keys
+SKILL_JOIN = {
+    frozenset({("employee_skills", "employee_id"), ("employees", "id")}),
+    frozenset({("employee_skills", "skill_id"), ("skills", "id")}),
+}
+
+_NUM = r"(-?\d+(?:\.\d+)?)"
+_REF = r"(?:\w+\s*\.\s*)?\w+"
+_STRING = r"'((?:[^']|'')*)'"
+_STRINGS = r"'(?:[^']|'')*'(?:\s*,\s*'(?:[^']|'')*')*"
+_TEXT_ARRAY = rf"ARRAY\s*\[\s*(?P<values>{_STRINGS})\s*\](?:\s*::\s*(?:text|varchar|character\s+varying)\s*\[\s*\])?"
+_GEOGRAPHY = r"\s*::\s*geography"
+_POINT_LITERAL = rf"'(?:SRID=4326;)?POINT\s*\(\s*{_NUM}\s+{_NUM}\s*\)'"
+
+# Geography point constructors, each capturing (long, lat)
+_POINTS = [
+    re.compile(rf"ST_SetSRID\s*\(\s*ST_(?:MakePoint|Point)\s*\(\s*{_NUM}\s*,\s*{_NUM}\s*\)\s*,\s*4326\s*\){_GEOGRAPHY}", re.I),
+    re.compile(rf"ST_(?:MakePoint|Point)\s*\(\s*{_NUM}\s*,\s*{_NUM}\s*\){_GEOGRAPHY}", re.I),
+    re.compile(rf"ST_Geog(?:raphy)?FromText\s*\(\s*{_POINT_LITERAL}\s*\)(?:{_GEOGRAPHY})?", re.I),
+    re.compile(rf"{_POINT_LITERAL}{_GEOGRAPHY}", re.I),
+]
+
+# Skill filters: (pattern, column, match_all)
+_SKILL_FILTERS = [
+    (re.compile(rf"(?P<column>{_REF})\s+IN\s*\(\s*(?P<values>{_STRINGS})\s*\)", re.I | re.S), "skill_name", False),
+    (re.compile(rf"(?P<column>{_REF})\s*=\s*(?P<values>'(?:[^']|'')*')", re.I | re.S), "skill_name", False),
+    (re.compile(rf"(?P<column>{_REF})\s*=\s*ANY\s*\(\s*{_TEXT_ARRAY}\s*\)", re.I | re.S), "skill_name", False),
+    (re.compile(rf"(?P<column>{_REF})\s*&&\s*{_TEXT_ARRAY}", re.I | re.S), "skills", False),
+    (re.compile(rf"(?P<column>{_REF})\s*@>\s*{_TEXT_ARRAY}", re.I | re.S), "skills", True),
+    (re.compile(rf"(?P<values>'(?:[^']|'')*')\s*=\s*ANY\s*\(\s*(?P<column>{_REF})\s*\)", re.I | re.S), "skills", False),
+]
+
+_CLAUSES = re.compile(
+    r"\s*SELECT\s+(?P<distinct>DISTINCT\s+)?(?P<select>.+?)\s+FROM\s+(?P<from>.+?)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?(?:\s+ORDER\s+BY\s+(?P<order>.+?))?(?:\s+LIMIT\s+(?P<limit>\d+))?\s*",
+    re.I | re.S,
+)
+
+
+def _mask_literals(sql: str) -> Optional[str]:
+    """`sql` with the contents of string literals blanked out (same length); None when a quote is left open"""
+    out, quoted = [], False
+    for ch in sql:
+        if ch == "'":
+            quoted = not quoted
+            out.append(ch)
+        else:
+            out.append("_" if quoted else ch)
+    return None if quoted else "".join(out)
+
+
+def _split(sql: str, mask: str, separator: str) -> List[str]:
+    """Pieces of `sql` between top-level (outside parentheses and literals) matches of `separator`"""
+    depths, depth = [], 0
+    for ch in mask:
+        depths.append(depth)
+        depth += (ch == "(") - (ch == ")")
+    pieces, start = [], 0
+    for match in re.finditer(separator, mask, re.I):
+        if depths[match.start()] == 0:
+            pieces.append(sql[start:match.start()].strip())
+            start = match.end()
+    pieces.append(sql[start:].strip())
+    return pieces
+
+
+def _call_args(expr: str, func: str) -> Optional[List[str]]:
+    """Arguments of `func(...)` when that call is the whole of `expr`"""
+    match = re.match(rf"\s*{func}\s*\(", expr, re.I)
+    mask = _mask_literals(expr)
+    if not match or mask is None:
+        return None
+    inner_end = mask.rfind(")")
+    if mask[inner_end + 1:].strip():
+        return None
+    inner = expr[match.end():inner_end]
+    args = _split(inner, mask[match.end():inner_end], ",")
+    depth = 0
+    for ch in mask[match.end():inner_end]:
+        depth += (ch == "(") - (ch == ")")
+        if depth < 0:
+            return None  # the opening parenthesis closes before the end
+    return args if depth == 0 else None
+
+
+def _strings(text: str) -> List[str]:
+    return [value.replace("''", "'") for value in re.findall(_STRING, text)]
+
+
+def _point(expr: str) -> Optional[Tuple[float, float]]:
+    """(lat, long) of a geography point literal"""
+    for pattern in _POINTS:
+        match = pattern.fullmatch(expr.strip())
+        if match:
+            return float(match.group(2)), float(match.group(1))
+    return None
+
+
+def _resolve(ref: str, tables: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    """(table, column) a column reference points at, None when unknown or ambiguous"""
+    alias, _, column = ref.replace(" ", "").lower().rpartition(".")
+    if alias:
+        table = tables.get(alias)
+        return (table, column) if table and column in TABLE_COLUMNS[table] else None
+    owners = {table for table in tables.values() if column in TABLE_COLUMNS[table]}
+    return (owners.pop(), column) if len(owners) == 1 else None
+
+
+def _employee_column(ref: str, tables: Dict[str, str]) -> Optional[str]:
+    resolved = _resolve(ref, tables)
+    return resolved[1] if resolved and resolved[0] in EMPLOYEE_TABLES else None
+
+
+def _geo_point(args: List[str], tables: Dict[str, str]) -> Optional[Tuple[float, float]]:
+    """The point of (location, point) / (point, location) geography arguments"""
+    if len(args) != 2:
+        return None
+    for location, point in (args, args[::-1]):
+        match = re.fullmatch(rf"({_REF})(?:{_GEOGRAPHY})?", location.strip(), re.I)
+        if match and _employee_column(match.group(1), tables) == "location":
+            return _point(point)
+    return None
+
+
+def _from_tables(clause: str) -> Optional[Dict[str, str]]:
+    """alias -> table for `employee_search`, `employees` or the employees/employee_skills/skills join"""
+    parts = re.split(r"\s+(?:INNER\s+)?JOIN\s+", clause.strip(), flags=re.I)
+    table_ref = r"(?:public\.)?(\w+)(?:\s+(?:AS\s+)?(?!ON\b)(\w+))?"
+    tables: Dict[str, str] = {}
+    conditions = []
+    for i, part in enumerate(parts):
+        match = re.fullmatch(table_ref + (r"\s+ON\s+(" + _REF + r")\s*=\s*(" + _REF + ")" if i else ""), part, re.I)
+        if not match or match.group(1).lower() not in TABLE_COLUMNS:
+            return None
+        alias = (match.group(2) or match.group(1)).lower()
+        if alias in tables:
+            return None
+        tables[alias] = match.group(1).lower()
+        if i:
+            conditions.append(match.group(3, 4))
+
+    if len(tables) == 1:
+        return tables if set(tables.values()) <= EMPLOYEE_TABLES else None
+    if sorted(tables.values()) != ["employee_skills", "employees", "skills"]:
+        return None
+    joined = {frozenset((_resolve(left, tables), _resolve(right, tables))) for left, right in conditions}
+    return tables if joined == SKILL_JOIN else None
+
+
+def params_from_sql(sql: str) -> Optional[dict]:
+    """
+    `search` keyword arguments for the crew's final query when it has exactly
+    the whitelisted shape above, or None if the index could answer it differently.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    mask = _mask_literals(sql)
+    if mask is None or '"' in mask or "--" in mask or "/*" in mask or len(re.findall(r"\bSELECT\b", mask, re.I)) != 1:
+        return None
+    clauses = _CLAUSES.fullmatch(mask)
+    if not clauses or not clauses.group("where"):
+        return None
+
+    def clause(name: str) -> str:
+        return sql[clauses.start(name):clauses.end(name)] if clauses.group(name) else ""
+
+    tables = _from_tables(clause("from"))
+    if tables is None:
+        return None
+    # The skill join yields one row per matching skill; only DISTINCT makes it one row per employee
+    if len(tables) > 1 and not clauses.group("distinct"):
+        return None
+
+    points = []
+    selected = []
+    for item in _split(clause("select"), mask[clauses.start("select"):clauses.end("select")], ","):
+        distance = re.fullmatch(r"(ST_Distance\s*\(.*\))\s+(?:AS\s+)?distance_m", item, re.I | re.S)
+        if distance:
+            args = _call_args(distance.group(1), "ST_Distance")
+            point = _geo_point(args, tables) if args else None
+            if point is None:
+                return None
+            points.append(point)
+            selected.append("distance_m")
+            continue
+        column = re.fullmatch(rf"({_REF})(?:\s+(?:AS\s+)?(\w+))?", item, re.I)
+        name = _employee_column(column.group(1), tables) if column else None
+        if name is None or name not in RESULT_COLUMNS or (column.group(2) or name).lower() != name:  # type: ignore[union-attr]
+            return None
+        selected.append(name)
+    if sorted(selected) != sorted(SEARCH_COLUMNS):
+        return None
+
+    radius_m = None
+    skills: Optional[List[str]] = None
+    match_all = False
+    filters: Dict[str, float] = {}
+    for conjunct in _split(clause("where"), mask[clauses.start("where"):clauses.end("where")], r"\bAND\b"):
+        dwithin = _call_args(conjunct, "ST_DWithin")
+        if dwithin is not None:
+            if radius_m is not None or len(dwithin) not in (3, 4) or \
+                    (len(dwithin) == 4 and dwithin[3].lower() not in ("true", "false")):
+                return None
+            point = _geo_point(dwithin[:2], tables)
+            radius = re.fullmatch(_NUM, dwithin[2])
+            if point is None or radius is None or float(radius.group(1)) < 0:
+                return None
+            points.append(point)
+            radius_m = float(radius.group(1))
+            continue
+
+        minimum = re.fullmatch(rf"({_REF})\s*>=\s*{_NUM}", conjunct, re.I)
+        if minimum:
+            name = _employee_column(minimum.group(1), tables)
+            if name not in ("rating", "years_of_experience") or name in filters:
+                return None
+            if name == "years_of_experience" and "." in minimum.group(2):
+                return None
+            filters[name] = float(minimum.group(2))
+            continue
+
+        not_null = re.fullmatch(rf"({_REF})\s+IS\s+NOT\s+NULL", conjunct, re.I)
+        if not_null and _employee_column(not_null.group(1), tables) == "location":
+            continue  # the index only holds located employees
+
+        for pattern, column, all_of in _SKILL_FILTERS:
+            match = pattern.fullmatch(conjunct)
+            if match:
+                resolved = _resolve(match.group("column"), tables)
+                if skills is not None or resolved is None or resolved[1] != column:
+                    return None
+                skills, match_all = _strings(match.group("values")), all_of
+                break
+        else:
+            return None
+
+    if radius_m is None or not skills:
+        return None
+
+    k = None
+    order = clause("order")
+    if order:
+        key = re.fullmatch(r"(.+?)(?:\s+ASC)?", order, re.I | re.S).group(1)  # type: ignore[union-attr]
+        if not re.fullmatch(r"(?:\w+\s*\.\s*)?distance_m", key, re.I):
+            args = _call_args(key, "ST_Distance")
+            point = _geo_point(args, tables) if args else None
+            if point is None:
+                return None
+            points.append(point)
+        if clauses.group("limit"):
+            k = int(clauses.group("limit"))
+    elif clauses.group("limit"):
+        return None  # an unordered LIMIT returns arbitrary rows
+
+    # Distances, the radius and the ordering must all be measured from the same place
+    lat, long = points[0]
+    if any(abs(p_lat - lat) > 1e-9 or abs(p_long - long) > 1e-9 for p_lat, p_long in points):
+        return None
+
+    return {
+        "lat": lat,
+        "long": long,
+        "radius_km": radius_m / 1000.0,
+        "skills": skills,
+        "k": k,
+        "match_all": match_all,
+        "min_rating": filters.get("rating"),
+        "min_experience": int(filters["years_of_experience"]) if "years_of_experience" in filters else None,
+    }
@@ -0,0 +1,197 @@
+"""Standing queries: open job postings matched against each newly registered worker.
+
+Every open posting is a predicate "has one of skills S, within R km of (lat, long)"
+(a posting without required skills matches on distance alone). Predicates are
+indexed twice:
+
+- spatially, by every CELL_DEG grid cell their circle touches, and
+- by skill id, in an inverted posting list.
+
+A new worker is matched by intersecting the postings registered in their cell
+with the postings for their skills, then checking the exact distance; neither
+postings nor employees are re-scanned.
+"""
+import math
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from search_index import CELL_DEG, EARTH_RADIUS_M
+
+OPEN_POSTINGS_QUERY = """
+SELECT jp.id, jp.employer_id, jp.title, jp.radius_km,
+ST_Y(jp.location::geometry) AS lat, ST_X(jp.location::geometry) AS long,
+COALESCE(array_agg(jrs.skill_id) FILTER (WHERE jrs.skill_id IS NOT NULL), '{}') AS skill_ids
+FROM job_postings jp
+LEFT JOIN job_required_skills jrs ON jrs.job_posting_id = jp.id
+WHERE (jp.is_active OR jp.is_active IS NULL) AND jp.location IS NOT NULL
+GROUP BY jp.id
+"""
+
+DEFAULT_RADIUS_KM = 10.0
+
+Cell = Tuple[int, int]
+
+
+def _cell(lat: float, long: float) -> Cell:
+    return math.floor(lat / CELL_DEG), math.floor(long / CELL_DEG)
+
+
+def _distance_m(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(long2 - long1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _covered_cells(lat: float, long: float, radius_m: float) -> List[Cell]:
+    """Every grid cell the circle's bounding box overlaps"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    coslat = max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+    dlon = min(dlat / coslat, 180.0)
+    lat_lo, lon_lo = _cell(lat - dlat, long - dlon)
+    lat_hi, lon_hi = _cell(lat + dlat, long + dlon)
+    return [(i, j) for i in range(lat_lo, lat_hi + 1) for j in range(lon_lo, lon_hi + 1)]
+
+
+class StandingQueryIndex:
+    """Open postings indexed by grid cell and by required skill"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, dict] = {}
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._by_skill: Dict[str, Set[str]] = {}
+        self._any_skill: Set[str] = set()
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_sync: Optional[float] = None
+        self.matched = 0
+
+    def __len__(self):
+        return len(self._postings)
+
+    def register(self, posting: dict):
+        """Add or replace the predicate for one posting (id, lat, long, radius_km, skill_ids, ...)"""
+        posting = {
+            **posting,
+            "id": str(posting["id"]),
+            "lat": float(posting["lat"]),
+            "long": float(posting["long"]),
+            "radius_km": float(posting.get("radius_km") or DEFAULT_RADIUS_KM),
+            "skill_ids": sorted(str(skill_id) for skill_id in posting.get("skill_ids") or []),
+        }
+        with self._lock:
+            self.remove(posting["id"])
+            posting["cells"] = _covered_cells(posting["lat"], posting["long"], posting["radius_km"] * 1000)
+            for cell in posting["cells"]:
+                self._cells.setdefault(cell, set()).add(posting["id"])
+            for skill_id in posting["skill_ids"]:
+                self._by_skill.setdefault(skill_id, set()).add(posting["id"])
+            if not posting["skill_ids"]:
+                self._any_skill.add(posting["id"])
+            self._postings[posting["id"]] = posting
+
+    def remove(self, posting_id: str):
+        with self._lock:
+            posting = self._postings.pop(str(posting_id), None)
+            if posting is None:
+                return
+            for cell in posting["cells"]:
+                ids = self._cells[cell]
+                ids.discard(posting["id"])
+                if not ids:
+                    del self._cells[cell]
+            for skill_id in posting["skill_ids"]:
+                ids = self._by_skill[skill_id]
+                ids.discard(posting["id"])
+                if not ids:
+                    del self._by_skill[skill_id]
+            self._any_skill.discard(posting["id"])
+
+    def sync(self, postings: Iterable[dict]):
+        """Bring the registered predicates in line with the open postings; unchanged ones are left alone"""
+        postings = [posting for posting in postings if posting.get("lat") is not None and posting.get("long") is not None]
+        with self._lock:
+            seen = set()
+            for posting in postings:
+                posting_id = str(posting["id"])
+                seen.add(posting_id)
+                current = self._postings.get(posting_id)
+                if current is None or self._changed(current, posting):
+                    self.register(posting)
+            for posting_id in set(self._postings) - seen:
+                self.remove(posting_id)
+            self.last_sync = time.time()
+
+    @staticmethod
+    def _changed(current: dict, posting: dict) -> bool:
+        return (
+            float(posting["lat"]) != current["lat"]
+            or float(posting["long"]) != current["long"]
+            or float(posting.get("radius_km") or DEFAULT_RADIUS_KM) != current["radius_km"]
+            or sorted(str(skill_id) for skill_id in posting.get("skill_ids") or []) != current["skill_ids"]
+        )
+
+    def match(self, lat: float, long: float, skill_ids: Iterable[str]) -> List[dict]:
+        """Open postings a worker at (lat, long) with `skill_ids` satisfies, nearest first"""
+        skill_ids = {str(skill_id) for skill_id in skill_ids}
+        with self._lock:
+            nearby = self._cells.get(_cell(lat, long))
+            if not nearby:
+                return []
+            wanted = set(self._any_skill)
+            for skill_id in skill_ids:
+                wanted |= self._by_skill.get(skill_id, set())
+
+            hits = []
+            for posting_id in nearby & wanted:
+                posting = self._postings[posting_id]
+                distance = _distance_m(lat, long, posting["lat"], posting["long"])
+                if distance <= posting["radius_km"] * 1000:
+                    hits.append({
+                        "posting_id": posting_id,
+                        "employer_id": posting.get("employer_id"),
+                        "title": posting.get("title"),
+                        "distance_m": distance,
+                        "skill_ids": sorted(skill_ids.intersection(posting["skill_ids"])),
+                    })
+            self.matched += len(hits)
+        return sorted(hits, key=lambda hit: (hit["distance_m"], hit["posting_id"]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "postings": len(self._postings),
+                "cells": len(self._cells),
+                "skills": len(self._by_skill),
+                "any_skill_postings": len(self._any_skill),
+                "matched": self.matched,
+                "last_sync": self.last_sync,
+            }
+
+    def start_polling(self, fetch_postings: Callable[[], Iterable[dict]], interval: float = 60.0):
+        """Pick up postings created, edited or closed through app_backend every `interval` seconds"""
+        if self._poller is not None:
+            return
+
+        def poll():
+            while not self._stop.is_set():
+                try:
+                    self.sync(fetch_postings())
+                    print(f"📌 Standing queries synced: {len(self)} open postings", flush=True)
+                except Exception as e:
+                    print(f"Standing query sync failed: {e}", flush=True)
+                self._stop.wait(interval)
+
+        self._poller = threading.Thread(target=poll, name="standing-query-poller", daemon=True)
+        self._poller.start()
+
+
+def fetch_open_postings(supabase, posting_id: Optional[str] = None) -> List[dict]:
+    """Every open posting, or only `posting_id` (a UUID; ValueError otherwise) when it is open"""
+    query = OPEN_POSTINGS_QUERY
+    if posting_id is not None:
+        query = query.replace("GROUP BY", f"AND jp.id = '{uuid.UUID(posting_id)}' GROUP BY")
+    return supabase.rpc("execute_sql", {"query": " ".join(query.split())}).execute().data or []
@@ -0,0 +1,127 @@
+"""Which final-query shapes params_from_sql answers from the index, and with what parameters."""
+import pytest
+
+from search_index import SearchIndex, params_from_sql
+
+POINT = "ST_SetSRID(ST_MakePoint(77.5946, 12.9716), 4326)::geography"
+OTHER_POINT = "ST_SetSRID(ST_MakePoint(77.6, 12.9716), 4326)::geography"
+COLUMNS = "e.id, e.name, e.email, e.phone, e.years_of_experience, e.language, e.rating, e.location"
+SEARCH_COLUMNS = COLUMNS.replace("e.", "")
+JOIN = ("employees e JOIN employee_skills es ON es.employee_id = e.id "
+        "JOIN skills s ON s.id = es.skill_id")
+
+
+def join_query(where: str = f"s.skill_name IN ('Plumber', 'Electrician') AND ST_DWithin(e.location, {POINT}, 10000)",
+               tail: str = "ORDER BY distance_m LIMIT 15", distinct: str = "DISTINCT ", point: str = POINT,
+               columns: str = COLUMNS, tables: str = JOIN) -> str:
+    return (f"SELECT {distinct}{columns}, ST_Distance(e.location, {point}) AS distance_m "
+            f"FROM {tables} WHERE {where} {tail};")
+
+
+def search_query(where: str, tail: str = "ORDER BY distance_m") -> str:
+    return (f"SELECT {SEARCH_COLUMNS}, ST_Distance(location, {POINT}) AS distance_m "
+            f"FROM employee_search WHERE {where} {tail}")
+
+
+BASE = {
+    "lat": 12.9716, "long": 77.5946, "radius_km": 10.0, "skills": ["Plumber", "Electrician"],
+    "k": 15, "match_all": False, "min_rating": None, "min_experience": None,
+}
+
+ACCEPTED = [
+    ("skill join", join_query(), {}),
+    ("without limit", join_query(tail="ORDER BY distance_m"), {"k": None}),
+    ("without order", join_query(tail=""), {"k": None}),
+    ("order by the distance expression", join_query(tail=f"ORDER BY ST_Distance(e.location, {POINT}) ASC LIMIT 5"),
+     {"k": 5}),
+    ("single skill", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 5000)"),
+     {"skills": ["Plumber"], "radius_km": 5.0}),
+    ("quoted skill", join_query(where=f"s.skill_name = 'Mason''s helper' AND ST_DWithin(e.location, {POINT}, 5000)"),
+     {"skills": ["Mason's helper"], "radius_km": 5.0}),
+    ("minimums", join_query(where=f"s.skill_name IN ('Plumber', 'Electrician') AND ST_DWithin(e.location, {POINT}, 10000) "
+                                  "AND e.rating >= 4.5 AND e.years_of_experience >= 3 AND e.location IS NOT NULL"),
+     {"min_rating": 4.5, "min_experience": 3}),
+    ("geography text point", join_query(
+        point="ST_GeogFromText('SRID=4326;POINT(77.5946 12.9716)')",
+        where="s.skill_name IN ('Plumber', 'Electrician') AND "
+              "ST_DWithin(e.location, ST_GeogFromText('SRID=4326;POINT(77.5946 12.9716)'), 10000)"), {}),
+    ("employee_search any", search_query(f"'Plumber' = ANY(skills) AND ST_DWithin(location, {POINT}, 2000)"),
+     {"skills": ["Plumber"], "radius_km": 2.0, "k": None}),
+    ("employee_search overlap", search_query(f"skills && ARRAY['Plumber', 'Electrician'] AND ST_DWithin(location, {POINT}, 10000)"),
+     {"k": None}),
+    ("employee_search contains", search_query(f"skills @> ARRAY['Plumber', 'Electrician']::text[] AND ST_DWithin(location, {POINT}, 10000)"),
+     {"k": None, "match_all": True}),
+]
+
+REJECTED = [
+    ("OR", join_query(where=f"s.skill_name = 'Plumber' OR ST_DWithin(e.location, {POINT}, 10000)")),
+    ("OR inside parentheses", join_query(where=f"(s.skill_name = 'Plumber' OR e.rating >= 4) AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("LEFT JOIN", join_query(tables=JOIN.replace("JOIN skills", "LEFT JOIN skills"))),
+    ("join on other keys", join_query(tables=JOIN.replace("es.skill_id", "es.employee_id"))),
+    ("extra table", join_query(tables=JOIN + " JOIN employers r ON r.id = e.id")),
+    ("join without DISTINCT", join_query(distinct="")),
+    ("mismatched distance point", join_query(point=OTHER_POINT)),
+    ("mismatched order point", join_query(tail=f"ORDER BY ST_Distance(e.location, {OTHER_POINT}) LIMIT 15")),
+    ("unordered LIMIT", join_query(tail="LIMIT 15")),
+    ("descending order", join_query(tail="ORDER BY distance_m DESC LIMIT 15")),
+    ("order by rating", join_query(tail="ORDER BY e.rating DESC LIMIT 15")),
+    ("OFFSET", join_query(tail="ORDER BY distance_m LIMIT 15 OFFSET 15")),
+    ("IS NULL", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 10000) AND e.rating IS NULL")),
+    ("rating IS NOT NULL", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 10000) AND e.rating IS NOT NULL")),
+    ("NOT IN", join_query(where=f"s.skill_name NOT IN ('Plumber') AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("ILIKE", join_query(where=f"s.skill_name ILIKE '%plumb%' AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("two skill filters", join_query(where=f"s.skill_name = 'Plumber' AND s.skill_name = 'Cook' AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("no skill filter", join_query(where=f"ST_DWithin(e.location, {POINT}, 10000)")),
+    ("no radius", join_query(where="s.skill_name = 'Plumber'")),
+    ("two radii", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 10000) AND ST_DWithin(e.location, {POINT}, 500)")),
+    ("radius from a column", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, e.rating)")),
+    ("geometry point", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, ST_SetSRID(ST_MakePoint(77.5946, 12.9716), 4326), 0.1)")),
+    ("maximum instead of minimum", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 10000) AND e.rating <= 3")),
+    ("fractional experience", join_query(where=f"s.skill_name = 'Plumber' AND ST_DWithin(e.location, {POINT}, 10000) AND e.years_of_experience >= 2.5")),
+    ("missing column", join_query(columns=COLUMNS.replace(", e.phone", ""))),
+    ("extra column", join_query(columns=COLUMNS + ", e.status")),
+    ("swapped columns", join_query(columns=COLUMNS.replace("e.name, e.email", "e.email AS name, e.name AS email"))),
+    ("skill column selected", join_query(columns=COLUMNS + ", s.skill_name")),
+    ("subquery", join_query(where=f"s.skill_name IN (SELECT skill_name FROM skills) AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("comment", join_query(tail="ORDER BY distance_m LIMIT 15 -- done")),
+    ("second statement", join_query() + " DELETE FROM employees"),
+    ("UNION", join_query(tail="") + " UNION " + join_query(tail="")),
+    ("GROUP BY", join_query(tail="GROUP BY e.id ORDER BY distance_m")),
+    ("unterminated literal", join_query(where=f"s.skill_name = 'Plumber AND ST_DWithin(e.location, {POINT}, 10000)")),
+    ("any on employees", join_query(where=f"'Plumber' = ANY(e.skills) AND ST_DWithin(e.location, {POINT}, 10000)")),
+]
+
+
+@pytest.mark.parametrize("name, sql, overrides", ACCEPTED, ids=[case[0] for case in ACCEPTED])
+def test_accepted_shapes(name, sql, overrides):
+    assert params_from_sql(sql) == {**BASE, **overrides}
+
+
+@pytest.mark.parametrize("name, sql", REJECTED, ids=[case[0] for case in REJECTED])
+def test_rejected_shapes(name, sql):
+    assert params_from_sql(sql) is None
+
+
+def employee(i: int, **overrides) -> dict:
+    row = {"id": f"e{i}", "name": f"Worker {i}", "email": None, "phone": None, "years_of_experience": 3,
+           "language": "English", "rating": 4.0, "location": None, "lat": 12.97 + i * 1e-4, "long": 77.59,
+           "skills": ["Plumber"]}
+    return {**row, **overrides}
+
+
+def test_apply_changes_and_removals():
+    index = SearchIndex()
+    index.apply([employee(i) for i in range(5)], None)
+    index.apply([employee(1, skills=["Cook"]), employee(2, lat=None), employee(9)], ["e3"])
+
+    assert sorted(index._ordinal_by_id) == ["e0", "e1", "e4", "e9"]
+    assert [row["id"] for row in index.search(12.97, 77.59, 5, ["Cook"])] == ["e1"]
+
+
+def test_sync_removes_employees_missing_from_the_snapshot():
+    index = SearchIndex()
+    index.sync([employee(i) for i in range(5)])
+    index.sync([employee(0), employee(4, rating=5.0)])
+
+    assert sorted(index._ordinal_by_id) == ["e0", "e4"]
+    assert index.search(12.97, 77.59, 5, ["Plumber"], min_rating=5)[0]["id"] == "e4"
@@ -0,0 +1,172 @@
+"""
+Summarise local traces: critical path per run and the slowest spans across runs.
+
+    python trace_report.py                          # every job under agents/notify_agent/traces
+    python trace_report.py traces/<job_id> --top 15
+    python trace_report.py --merge                  # also write traces/<job_id>/merged.json
+
+Each job directory holds backend.json and crew.json (Chrome trace format).
+Their spans are merged into one tree by time containment: the backend's
+crew_run span contains the crew's spans, which contain their tasks, agents,
+LLM calls and tools. The critical path follows, from the root, the child that
+finishes last at every level, i.e. the chain of spans that decided when the
+job returned.
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Optional
+
+DEFAULT_TRACE_DIR = os.getenv(
+    "TRACE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents", "notify_agent", "traces")
+)
+
+
+class Span:
+    def __init__(self, event: dict, source: str):
+        self.name = event["name"]
+        self.cat = event.get("cat", "")
+        self.source = source
+        self.start = event["ts"]
+        self.end = event["ts"] + event.get("dur", 0)
+        self.args = event.get("args", {})
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) / 1000
+
+    @property
+    def self_ms(self) -> float:
+        """Time not covered by any child span"""
+        covered, cursor = 0, self.start
+        for child in sorted(self.children, key=lambda span: span.start):
+            start, end = max(child.start, cursor), min(child.end, self.end)
+            if end > start:
+                covered += end - start
+                cursor = end
+        return (self.end - self.start - covered) / 1000
+
+
+def load_job(job_dir: str) -> List[dict]:
+    """All trace events of one job, tagged with the file (process) they came from"""
+    events = []
+    for name in sorted(os.listdir(job_dir)):
+        if not name.endswith(".json") or name == "merged.json":
+            continue
+        with open(os.path.join(job_dir, name), "r") as f:
+            for event in json.load(f).get("traceEvents", []):
+                events.append({**event, "source": name[:-5]})
+    return events
+
+
+def build_tree(events: List[dict]) -> Optional[Span]:
+    """Nest complete ("X") spans by time containment; returns the outermost span"""
+    spans = sorted(
+        (Span(event, event["source"]) for event in events if event.get("ph") == "X"),
+        key=lambda span: (span.start, -span.end),
+    )
+    if not spans:
+        return None
+
+    roots: List[Span] = []
+    stack: List[Span] = []
+    for span in spans:
+        while stack and stack[-1].end < span.end:
+            stack.pop()
+        (stack[-1].children if stack else roots).append(span)
+        stack.append(span)
+
+    if len(roots) == 1:
+        return roots[0]
+    # Several top-level spans (e.g. a crew run without backend spans): give them a common root
+    root = Span({"name": "run", "ts": roots[0].start, "dur": max(r.end for r in roots) - roots[0].start}, "")
+    root.children = roots
+    return root
+
+
+def critical_path(root: Span) -> List[Span]:
+    path = [root]
+    while path[-1].children:
+        path.append(max(path[-1].children, key=lambda span: span.end))
+    return path
+
+
+def walk(span: Span):
+    yield span
+    for child in span.children:
+        yield from walk(child)
+
+
+def merge(job_dir: str, events: List[dict]):
+    """One Chrome trace with the backend and crew processes side by side"""
+    with open(os.path.join(job_dir, "merged.json"), "w") as f:
+        json.dump({"traceEvents": [{k: v for k, v in event.items() if k != "source"} for event in events],
+                   "displayTimeUnit": "ms"}, f)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def job_dirs(paths: List[str]) -> List[str]:
+    dirs = []
+    for path in paths:
+        if any(name.endswith(".json") for name in os.listdir(path)):
+            dirs.append(path)
+        else:
+            dirs.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.isdir(os.path.join(path, name))
+            )
+    return dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_TRACE_DIR], help="trace root or job directories")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest spans / span kinds to list")
+    parser.add_argument("--merge", action="store_true", help="write merged.json into every job directory")
+    args = parser.parse_args()
+
+    by_name: Dict[str, List[float]] = {}
+    slowest: List[tuple] = []
+    for job_dir in job_dirs(args.paths):
+        events = load_job(job_dir)
+        root = build_tree(events)
+        if root is None:
+            continue
+        if args.merge:
+            merge(job_dir, events)
+
+        job = os.path.basename(job_dir)
+        print(f"\n== {job}: {root.duration_ms:.0f} ms")
+        print(f"   {'critical path':<60} {'total ms':>10} {'self ms':>10}")
+        for depth, span in enumerate(critical_path(root)):
+            label = f"{'  ' * depth}{span.name}"[:60]
+            print(f"   {label:<60} {span.duration_ms:>10.1f} {span.self_ms:>10.1f}")
+
+        for span in walk(root):
+            if span.source:
+                by_name.setdefault(span.name, []).append(span.duration_ms)
+                slowest.append((span.duration_ms, job, span.name))
+
+    if not by_name:
+        print("No traces found")
+        return
+
+    print(f"\n== Slowest spans")
+    for duration, job, name in sorted(slowest, reverse=True)[:args.top]:
+        print(f"   {duration:>10.1f} ms  {name[:60]:<60} {job}")
+
+    print(f"\n== Span kinds by total time")
+    print(f"   {'span':<50} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'total ms':>11}")
+    kinds = sorted(by_name.items(), key=lambda item: sum(item[1]), reverse=True)[:args.top]
+    for name, durations in kinds:
+        print(f"   {name[:50]:<50} {len(durations):>6} {percentile(durations, 0.5):>10.1f} "
+              f"{percentile(durations, 0.95):>10.1f} {sum(durations):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Backend spans for one /complete job, exported as a Chrome trace.
+
+The stages the backend runs itself (location RPC, writing input.json,
+starting the crew process, waiting for it, reading and ranking the output)
+are timed here and written to traces/<job_id>/backend.json. The crew
+process writes its own spans for the same job to traces/<job_id>/crew.json
+(see notify_agent.tracing); trace_report.py merges the two.
+
+Job directories are pruned after every save: only the newest TRACE_MAX_JOBS
+are kept, and none older than TRACE_MAX_AGE_SECONDS (0 disables either limit).
+"""
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+LOCAL_TRACING = os.getenv("LOCAL_TRACING", "1") == "1"
+TRACE_MAX_JOBS = int(os.getenv("TRACE_MAX_JOBS", "200"))
+TRACE_MAX_AGE_SECONDS = float(os.getenv("TRACE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+BACKEND_TID = 1
+
+
+class JobTrace:
+    def __init__(self, job_id: str, trace_dir: str, enabled: bool = LOCAL_TRACING):
+        self.job_id = job_id
+        self.trace_dir = trace_dir
+        self.enabled = enabled
+        self.events: List[dict] = []
+
+    @contextmanager
+    def span(self, name: str, **args):
+        started = time.time()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if self.enabled:
+                self.events.append({
+                    "name": name, "cat": "backend", "ph": "X",
+                    "ts": int(started * 1_000_000), "dur": int((time.time() - started) * 1_000_000),
+                    "pid": os.getpid(), "tid": BACKEND_TID, "args": args,
+                })
+
+    def mark(self, name: str, timestamp: Optional[float] = None, **args):
+        """Instant event, e.g. the moment the first candidate reached the client"""
+        if self.enabled:
+            self.events.append({
+                "name": name, "cat": "backend", "ph": "i", "s": "p",
+                "ts": int((timestamp or time.time()) * 1_000_000),
+                "pid": os.getpid(), "tid": BACKEND_TID, "args": args,
+            })
+
+    def save(self) -> Optional[str]:
+        if not self.enabled or not self.events:
+            return None
+        trace_dir = os.path.realpath(self.trace_dir)
+        path = os.path.realpath(os.path.join(trace_dir, self.job_id, "backend.json"))
+        # The job id names the directory; it must not lead anywhere outside trace_dir
+        if os.path.dirname(os.path.dirname(path)) != trace_dir:
+            print(f"Not writing trace for job id {self.job_id!r}: outside {trace_dir}", flush=True)
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "backend"}}]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + sorted(self.events, key=lambda e: e["ts"]),
+                       "displayTimeUnit": "ms", "otherData": {"job_id": self.job_id}}, f)
+        prune(trace_dir, keep=self.job_id)
+        return path
+
+
+def prune(trace_dir: str, max_jobs: int = TRACE_MAX_JOBS, max_age_seconds: float = TRACE_MAX_AGE_SECONDS,
+          keep: Optional[str] = None) -> List[str]:
+    """Delete job directories beyond the newest `max_jobs` or older than `max_age_seconds`; returns their names"""
+    try:
+        entries = [entry for entry in os.scandir(trace_dir) if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+    # Newest first; a directory's mtime moves whenever the backend or the crew writes into it
+    entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_mtime, reverse=True)
+    cutoff = time.time() - max_age_seconds
+    removed = []
+    for position, entry in enumerate(entries):
+        too_many = max_jobs > 0 and position >= max_jobs
+        too_old = max_age_seconds > 0 and entry.stat(follow_symlinks=False).st_mtime < cutoff
+        if entry.name != keep and (too_many or too_old):
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(entry.name)
+    return removed
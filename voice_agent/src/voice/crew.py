@@ -4,6 +4,7 @@ from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
 from crewai_tools import TavilySearchTool
 from voice.tools import user_input
+from voice.llm_cache import cached_llm
 
 tavily_tool = TavilySearchTool()
 
@@ -19,7 +20,8 @@ class Voice():
         return Agent(
             config=self.agents_config['support_agent'], # type: ignore[index]
             verbose=True,
-            tools=[user_input.TakeUserInputTool()]
+            tools=[user_input.TakeUserInputTool()],
+            llm=cached_llm(),
         )
 
     @agent
@@ -27,6 +29,7 @@ class Voice():
         return Agent(
             config=self.agents_config['skill_agent'], # type: ignore[index]
             verbose=True,
+            llm=cached_llm(),
         )
 
     @agent
@@ -35,6 +38,7 @@ class Voice():
             config=self.agents_config['location_agent'], # type: ignore[index]
             verbose=True,
             tools=[tavily_tool],
+            llm=cached_llm(),
         )
 
     @task
@@ -66,6 +70,7 @@ class FindSkillKeyword():
         return Agent(
             config=self.agents_config['skill_agent'], # type: ignore[index]
             verbose=True,
+            llm=cached_llm(),
         )
 
     @agent
@@ -73,7 +78,8 @@ class FindSkillKeyword():
         return Agent(
             config=self.agents_config['support_agent'], # type: ignore[index]
             verbose=True,
-            tools=[user_input.TakeUserInputTool()]
+            tools=[user_input.TakeUserInputTool()],
+            llm=cached_llm(),
         )
     
     @agent
@@ -82,6 +88,7 @@ class FindSkillKeyword():
             config=self.agents_config['location_agent'], # type: ignore[index]
             verbose=True,
             tools=[tavily_tool],
+            llm=cached_llm(),
         )
 
     @task
@@ -117,6 +124,7 @@ class LocationFinderCrew():
             config=self.agents_config['location_agent'], # type: ignore[index]
             verbose=True,
             tools=[tavily_tool],
+            llm=cached_llm(),
         )
     
     @agent
@@ -124,7 +132,8 @@ class LocationFinderCrew():
         return Agent(
             config=self.agents_config['support_agent'], # type: ignore[index]
             verbose=True,
-            tools=[user_input.TakeUserInputTool()]
+            tools=[user_input.TakeUserInputTool()],
+            llm=cached_llm(),
         )
     
     @agent
@@ -132,6 +141,7 @@ class LocationFinderCrew():
         return Agent(
             config=self.agents_config['skill_agent'], # type: ignore[index]
             verbose=True,
+            llm=cached_llm(),
         )
 
     @task
@@ -149,4 +159,38 @@ class LocationFinderCrew():
             tasks=self.tasks, # Automatically created by the @task decorator
             process=Process.sequential,
             verbose=True,
-        )
\ No newline at end of file
+        )
+
+# Crew that reads a recorded call's transcript instead of interviewing live;
+# only the support agent is needed, so no tool calls or search are made
+@CrewBase
+class TranscriptExtractionCrew():
+    """Transcript Extraction Crew"""
+
+    agents: List[BaseAgent]
+    tasks: List[Task]
+
+    @agent
+    def support_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config['support_agent'], # type: ignore[index]
+            verbose=True,
+            llm=cached_llm(),
+        )
+
+    @task
+    def extract_info_from_transcript_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['extract_info_from_transcript'], # type: ignore[index]
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the Transcript Extraction crew"""
+
+        return Crew(
+            agents=self.agents, # Automatically created by the @agent decorator
+            tasks=self.tasks, # Automatically created by the @task decorator
+            process=Process.sequential,
+            verbose=True,
+        )
@@ -0,0 +1,19 @@
+"""The voice crews' LLM behind the shared response cache and LLM scheduler (crew_llm)."""
+import os
+from pathlib import Path
+
+from crewai.llms.base_llm import BaseLLM
+
+from crew_llm.cache import LLMCacheEvent, LLMCacheMiss, cache_report
+from crew_llm.cache import cached_llm as shared_cached_llm
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # project root
+
+# Live calls outrank interactive searches; batch onboarding sets LLM_PRIORITY=batch
+LLM_PRIORITY = os.getenv("LLM_PRIORITY", "voice")
+
+__all__ = ["LLMCacheEvent", "LLMCacheMiss", "cache_report", "cached_llm"]
+
+
+def cached_llm(llm=None) -> BaseLLM:
+    return shared_cached_llm(llm, cache_path=str(ROOT_DIR / ".llm_cache.sqlite3"), priority=LLM_PRIORITY)
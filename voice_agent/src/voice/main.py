@@ -6,12 +6,20 @@ from voice.crew import Voice, FindSkillKeyword, LocationFinderCrew
 import json
 from deep_translator import GoogleTranslator
 from voice.db.config import supabase
+from voice.llm_cache import cache_report
 import re
 import uuid
+import os
+import requests
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 translator = GoogleTranslator(source="auto", target="en")
 
+# Backend that matches new workers against open job postings
+STANDING_QUERIES_URL = os.getenv("STANDING_QUERIES_URL", "http://localhost:8000")
+# Backend that rebuilds the worker's employee_search row (the triggers only queue it)
+EMPLOYEE_SEARCH_URL = os.getenv("EMPLOYEE_SEARCH_URL", "http://localhost:8000")
+
 # Regex: allows English letters, numbers, spaces, and common punctuation
 ENGLISH_ONLY_REGEX = re.compile(r'^[A-Za-z0-9\s.,\-_/()]+$')
 
@@ -45,12 +53,28 @@ def work_translate():
 
     print("Translation complete.")
 
+def missing_fields(info: dict) -> list:
+    """Details of an extracted info.json that are absent (null or empty) and needed to save the worker"""
+    location = info.get("location") or {}
+    missing = [field for field in ("name", "expertise") if not str(info.get(field) or "").strip()]
+    if not str(location.get("city") or "").strip():
+        missing.append("location")
+    try:
+        if float(info.get("years_of_experience")) < 0:  # type: ignore[arg-type]
+            missing.append("years_of_experience")
+    except (TypeError, ValueError):
+        missing.append("years_of_experience")
+    return missing
+
 def save_db(language: str, skills_id: list):
     user_id = uuid.uuid4()
     with open("info_english.json", "r", encoding="utf-8") as f:
         data = json.load(f)
-        name = data["name"]
-        years_of_experience = data["years_of_experience"]
+    missing = missing_fields(data)
+    if missing:
+        raise ValueError(f"Worker details missing: {', '.join(missing)}")
+    name = str(data["name"]).strip()
+    years_of_experience = int(float(data["years_of_experience"]))
 
     with open("precise_location.json", "r", encoding="utf-8") as f:
         location_data = json.load(f)
@@ -58,42 +82,21 @@ def save_db(language: str, skills_id: list):
         lon = location_data["longitude"]
         region = location_data["region"]
         city = location_data["city"]
-    
-    location_sql = (
-        f"ST_GeogFromText('POINT({lon} {lat})')"
-        if lat is not None and lon is not None
-        else "NULL"
-    )
-
-    SQL_QUERY = f"""
-    INSERT INTO public.employees (
-        id,
-        name,
-        email,
-        password_hash,
-        years_of_experience,
-        location,
-        address,
-        language,
-        status,
-        user_type
-    )
-    VALUES (
-        '{user_id}',
-        '{name}',
-        '{user_id}',
-        '{user_id}',
-        {years_of_experience},
-        {location_sql},
-        '{region}, {city}',
-        '{language}',
-        'active',
-        'non-smartphone'
-    );
-    """
 
     response = (
-        supabase.rpc("run_sql", {"query": SQL_QUERY}).execute()
+        supabase.table("employees").insert({
+            "id": str(user_id),
+            "name": name,
+            "email": str(user_id),
+            "password_hash": str(user_id),
+            "years_of_experience": years_of_experience,
+            # PostgREST takes WKT for geography columns
+            "location": f"POINT({float(lon)} {float(lat)})" if lat is not None and lon is not None else None,
+            "address": ", ".join(part for part in (region, city) if part),
+            "language": language,
+            "status": "active",
+            "user_type": "non-smartphone",
+        }).execute()
     )
 
     for skill_id in skills_id:
@@ -106,6 +109,43 @@ def save_db(language: str, skills_id: list):
 
     print("User and skills saved to database:", response)
 
+    refresh_employee_search()
+
+    notify_new_worker({
+        "id": str(user_id),
+        "name": name,
+        "lat": lat,
+        "long": lon,
+        "years_of_experience": years_of_experience,
+        "language": language,
+        "skill_ids": skills_id,
+    })
+    return str(user_id)
+
+
+def notify_new_worker(worker: dict):
+    """Let the backend push this worker to employers whose open postings they match"""
+    if not STANDING_QUERIES_URL:
+        return
+    try:
+        response = requests.post(f"{STANDING_QUERIES_URL}/standing/workers", json=worker, timeout=5)
+        response.raise_for_status()
+        print(f"Matched {len(response.json()['matches'])} open job postings")
+    except Exception as e:
+        print(f"Could not match the new worker against open postings: {e}")
+
+
+def refresh_employee_search():
+    """Make the new worker searchable now rather than at the backend's next refresh"""
+    if not EMPLOYEE_SEARCH_URL:
+        return
+    try:
+        response = requests.post(f"{EMPLOYEE_SEARCH_URL}/employee_search/refresh", timeout=10)
+        response.raise_for_status()
+        print(f"employee_search refreshed {response.json()['refreshed']} rows")
+    except Exception as e:
+        print(f"Could not refresh employee_search, the backend will catch up: {e}")
+
 
 def find_skill_keywords():
     with open("info_english.json", "r", encoding="utf-8") as f:
@@ -149,6 +189,9 @@ def run():
 
         with open("info_english.json", "r", encoding="utf-8") as f:
             data = json.load(f)
+            missing = missing_fields(data)
+            if missing:
+                raise ValueError(f"Worker details missing: {', '.join(missing)}")
             location_inputs = {}
 
             location_inputs["region"] = data["location"]["region"]
@@ -156,5 +199,6 @@ def run():
         
         LocationFinderCrew().crew().kickoff(inputs=location_inputs)
         save_db(inputs["language"],skills_data)
+        print("LLM cache:", cache_report())
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
\ No newline at end of file
@@ -2,8 +2,6 @@ from crewai.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
 from openai import OpenAI
-import sounddevice as sd
-import wavio
 import soundfile as sf
 
 client = OpenAI()
@@ -24,6 +22,9 @@ def speak_and_play(text: str, out_path: str = "speech.mp3") -> str:
 
     print(f"✔ Saved to {out_path}")
 
+    # Imported here so batch onboarding runs on machines without an audio device
+    import sounddevice as sd
+
     data, fs = sf.read(out_path, dtype="int16")
     sd.play(data, fs)
     sd.wait()
@@ -32,6 +33,9 @@ def speak_and_play(text: str, out_path: str = "speech.mp3") -> str:
     return out_path
 
 def record_audio(duration=5, out_path="spoken_answer.wav"):
+    import sounddevice as sd
+    import wavio
+
     print("🎤 Speak your answer now...")
     fs = 44100
     audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)